@@ -1,65 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from contextlib import asynccontextmanager
-import uuid
-from datetime import datetime, timedelta
-
-from data.get_youtube_data import YouTubeDataFetcher
-from data.preprocess import merge_chapter_transcript, get_prompt, get_video_info
-from api.replicate_api import llama3_8b
-from src.vectorstore import get_retriever
-from src.chat import chat, get_chat_chain
-
-
-class SessionManager:
-    def __init__(self):
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-        self.chat_histories: Dict[str, List] = {}
-        self.session_timestamps: Dict[str, datetime] = {}
-        # Cleanup after 1 hour of inactivity
-        self.cleanup_interval = timedelta(hours=1)
-
-    def create_session(self) -> str:
-        session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {}
-        self.chat_histories[session_id] = []
-        self.session_timestamps[session_id] = datetime.now()
-        return session_id
-
-    def get_session(self, session_id: str) -> Dict[str, Any]:
-        if session_id in self.sessions:
-            self.session_timestamps[session_id] = datetime.now()
-            return self.sessions.get(session_id, {})
-        return {}
-
-    def set_session(self, session_id: str, data: Dict[str, Any]):
-        self.sessions[session_id] = data
-        self.session_timestamps[session_id] = datetime.now()
-
-    def get_chat_history(self, session_id: str) -> List:
-        if session_id in self.chat_histories:
-            self.session_timestamps[session_id] = datetime.now()
-            return self.chat_histories.get(session_id, [])
-        return []
-
-    def set_chat_history(self, session_id: str, history: List):
-        self.chat_histories[session_id] = history
-        self.session_timestamps[session_id] = datetime.now()
-
-    def cleanup_old_sessions(self):
-        current_time = datetime.now()
-        expired_sessions = [
-            session_id
-            for session_id, timestamp in self.session_timestamps.items()
-            if (current_time - timestamp) > self.cleanup_interval
-        ]
-        for session_id in expired_sessions:
-            self.sessions.pop(session_id, None)
-            self.chat_histories.pop(session_id, None)
-            self.session_timestamps.pop(session_id, None)
-
+from datetime import date
+import asyncio
+import functools
+import importlib
+import logging
+import os
+import json
+import time
+
+from data.preprocess import merge_chapter_transcript, get_video_info
+from data.prompt_builder import max_output_tokens
+from utils.concurrency import BoundedExecutor, ExecutorBusy
+from utils.helpers import seconds_to_hms
+from api.session_store import SessionManager
+from utils.metrics import CONTENT_TYPE_LATEST, render_metrics, stage
+
+if TYPE_CHECKING:
+    from data.get_youtube_data import YouTubeDataFetcher
+    from src.index_store import IndexStore
+
+
+logger = logging.getLogger(__name__)
+
+# LangChain, FAISS, Replicate and the Google client are slow to import, so the
+# API loads them in the background after the port binds
+HEAVY_MODULES = (
+    "data.get_youtube_data",
+    "api.replicate_api",
+    "src.embeddings",
+    "src.corpus_index",
+    "src.index_store",
+    "src.vectorstore",
+    "src.chat",
+    "src.summarizer",
+    "src.batch",
+    "src.jobs",
+)
+READY_TIMEOUT = float(os.getenv("STARTUP_READY_TIMEOUT", 60))
 
 session_manager = SessionManager()
 
@@ -80,9 +62,77 @@ class SummaryResponse(BaseModel):
     youtube_url: str
 
 
+class Citation(BaseModel):
+    start: float
+    end: float
+    timestamp: str
+    chapter: Optional[str] = None
+    url: str
+
+
 class QAResponse(BaseModel):
     response: str
     youtube_url: str  # Include the YouTube URL for context
+    citations: List[Citation] = Field(default_factory=list)
+
+
+class SearchHit(BaseModel):
+    video_id: str
+    title: str
+    channel: str
+    publish_date: str
+    chapter: Optional[str] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
+    timestamp: Optional[str] = None
+    url: str
+    text: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+
+class BatchRequest(BaseModel):
+    youtube_urls: List[HttpUrl] = Field(default_factory=list)
+    playlist_id: Optional[str] = None
+
+
+class BatchStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    created_at: str
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobRequest(BaseModel):
+    youtube_url: HttpUrl
+    session_id: Optional[str] = Field(
+        None,
+        description="Session to attach the result to; a new one is created if omitted",
+    )
+    webhook_url: Optional[HttpUrl] = None
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    youtube_url: str
+    session_id: Optional[str] = None
+    status: str
+    stage: Optional[str] = None
+    timings: Dict[str, float] = Field(default_factory=dict)
+    attempts: Dict[str, int] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
+    deliveries: int = 0
 
 
 class VideoInfo(BaseModel):
@@ -90,14 +140,121 @@ class VideoInfo(BaseModel):
     youtube_url: str
 
 
+def import_services():
+    """Import the heavy modules; gunicorn calls this in the master before forking."""
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+def build_services(app: FastAPI):
+    import_services()
+    from api.replicate_api import get_replicate_client
+    from data.get_youtube_data import YouTubeDataFetcher
+    from src.batch import BatchRunner
+    from src.corpus_index import get_corpus_index
+    from src.embeddings import (
+        EmbeddingService,
+        get_embedding_cache,
+        get_embedding_engine,
+    )
+    from src.index_store import IndexStore
+    from src.jobs import JobQueue, get_job_broker
+
+    # One pooled client per upstream, shared by summaries, Q&A, jobs and batches
+    app.state.replicate_client = get_replicate_client()
+    youtube = YouTubeDataFetcher()
+    app.state.youtube = youtube
+    app.state.proxy_pool = youtube.proxy_pool
+    embeddings = get_embedding_engine()
+    embeddings.warm_up()
+    app.state.embeddings = embeddings
+    embedding_service = EmbeddingService(embeddings, get_embedding_cache())
+    app.state.corpus_index = get_corpus_index(embedding_service)
+    app.state.index_store = IndexStore(
+        embeddings,
+        embedding_service=embedding_service,
+        corpus_index=app.state.corpus_index,
+    )
+    session_manager.index_store = app.state.index_store
+    app.state.batch_runner = BatchRunner(
+        youtube,
+        corpus_index=app.state.corpus_index,
+        embed_executor=app.state.embed_executor,
+    )
+    app.state.job_queue = JobQueue(
+        get_job_broker(),
+        youtube,
+        app.state.io_executor,
+        app.state.embed_executor,
+        app.state.index_store,
+        session_manager,
+    )
+
+
+async def start_services(app: FastAPI):
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(build_services, app)
+        app.state.job_queue.start()
+        app.state.eviction_task = asyncio.create_task(
+            session_manager.run_eviction(
+                float(os.getenv("SESSION_EVICTION_INTERVAL", 60))
+            )
+        )
+        logger.info(f"Services ready in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logger.error(f"Startup failed: {e}")
+        app.state.startup_error = str(e)
+    finally:
+        app.state.started.set()
+
+
+async def wait_until_ready():
+    """Hold requests that arrive while services are still loading."""
+    try:
+        await asyncio.wait_for(app.state.started.wait(), READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Service is starting up")
+    if app.state.startup_error:
+        raise HTTPException(
+            status_code=503, detail=f"Startup failed: {app.state.startup_error}"
+        )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    youtube = YouTubeDataFetcher()
-    app.state.youtube = youtube
+    app.state.started = asyncio.Event()
+    app.state.startup_error = None
+    # Blocking network calls (YouTube, Replicate) and CPU-bound embedding run
+    # on separate bounded pools so they never stall the event loop
+    app.state.io_executor = BoundedExecutor.from_env(
+        "io", default_workers=32, default_pending=128
+    )
+    app.state.embed_executor = BoundedExecutor.from_env(
+        "embed", default_workers=2, default_pending=16
+    )
+    startup_task = asyncio.create_task(start_services(app))
     yield
     # Shutdown
-    session_manager.cleanup_old_sessions()
+    startup_task.cancel()
+    if getattr(app.state, "eviction_task", None) is not None:
+        app.state.eviction_task.cancel()
+    if getattr(app.state, "job_queue", None) is not None:
+        await app.state.job_queue.stop()
+    await asyncio.to_thread(session_manager.cleanup_old_sessions)
+    if getattr(app.state, "corpus_index", None) is not None:
+        app.state.corpus_index.close()
+    if getattr(app.state, "batch_runner", None) is not None:
+        app.state.batch_runner.shutdown()
+    app.state.io_executor.shutdown(wait=False)
+    app.state.embed_executor.shutdown(wait=False)
+    if getattr(app.state, "proxy_pool", None) is not None:
+        app.state.proxy_pool.stop()
+    if getattr(app.state, "replicate_client", None) is not None:
+        from api.replicate_api import close_replicate_client
+
+        close_replicate_client()
 
 
 app = FastAPI(
@@ -117,38 +274,107 @@ app.add_middleware(
 
 
 async def get_youtube_client():
+    await wait_until_ready()
     return app.state.youtube
 
 
+async def get_index_store():
+    await wait_until_ready()
+    return app.state.index_store
+
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """200 once models and clients are loaded, 503 while starting or after a failure."""
+    if app.state.startup_error:
+        return JSONResponse(
+            {"status": "failed", "detail": app.state.startup_error}, status_code=503
+        )
+    if not app.state.started.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
+
+
 @app.post("/create_session")
 async def create_session():
-    session_id = session_manager.create_session()
+    # Session calls may be Redis round trips, so they run off the event loop
+    session_id = await asyncio.to_thread(session_manager.create_session)
     return {"session_id": session_id}
 
 
+def release_unclaimed_index(index_store: "IndexStore", task: asyncio.Future):
+    """Drop the index reference a retriever task took for a session never stored."""
+    if not task.cancelled() and task.exception() is None:
+        index_store.release(task.result()[1])
+
+
 @app.post("/summarize", response_model=SummaryResponse)
 async def summarize(
-    request: YouTubeRequest, youtube: YouTubeDataFetcher = Depends(get_youtube_client)
+    request: YouTubeRequest,
+    youtube=Depends(get_youtube_client),
+    index_store=Depends(get_index_store),
 ):
+    from api.replicate_api import llama3_8b
+    from src.summarizer import get_summary_prompt
+    from src.vectorstore import add_to_corpus_later, get_retriever
+
+    io_executor = app.state.io_executor
+    embed_executor = app.state.embed_executor
+    retriever_task = None
+    session_stored = False
     try:
-        meta_data = youtube.get_meta_data(str(request.youtube_url))
-        chapter_transcript = merge_chapter_transcript(meta_data)
-        prompt = get_prompt(meta_data, chapter_transcript)
-        response = llama3_8b(prompt)
-
-        retriever = get_retriever(meta_data, chapter_transcript)
-        chat_chain = get_chat_chain(retriever)
+        meta_data = await io_executor.run(
+            youtube.get_meta_data, str(request.youtube_url)
+        )
+        chapter_transcript = await io_executor.run(merge_chapter_transcript, meta_data)
+
+        async def generate_summary():
+            with stage("summary_prompt"):
+                prompt = await get_summary_prompt(
+                    meta_data, chapter_transcript, llama3_8b, io_executor
+                )
+            return await io_executor.run(llama3_8b, prompt, max_output_tokens(prompt))
+
+        # Summary generation and embedding are independent, so overlap them.
+        # The shield keeps a cancelled request from dropping an index the
+        # worker thread has already acquired; the finally block releases it.
+        retriever_task = asyncio.ensure_future(
+            embed_executor.run(
+                get_retriever, meta_data, chapter_transcript, index_store
+            )
+        )
+        summary_result, retriever_result = await asyncio.gather(
+            generate_summary(),
+            asyncio.shield(retriever_task),
+            return_exceptions=True,
+        )
+        if isinstance(retriever_result, BaseException):
+            raise retriever_result
+        retriever, index_key = retriever_result
+        add_to_corpus_later(
+            meta_data, chapter_transcript, index_store.corpus_index, embed_executor
+        )
+        if isinstance(summary_result, BaseException):
+            raise summary_result
+        response = summary_result
 
-        session_manager.set_session(
+        await asyncio.to_thread(
+            session_manager.set_session,
             request.session_id,
             {
-                "meta_data": meta_data,
-                "chapter_transcript": chapter_transcript,
-                "retriever": retriever,
-                "chat_chain": chat_chain,
                 "youtube_url": str(request.youtube_url),
+                "video_id": meta_data.video_id,
+                "title": meta_data.title,
+                "index_key": index_key,
             },
         )
+        session_manager.hold_index(request.session_id, index_key, retriever)
+        session_stored = True
 
         return SummaryResponse(
             response=response,
@@ -156,47 +382,353 @@ async def summarize(
             youtube_url=str(request.youtube_url),
         )
 
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Failed or cancelled requests must not keep the index referenced
+        if retriever_task is not None and not session_stored:
+            retriever_task.add_done_callback(
+                functools.partial(release_unclaimed_index, index_store)
+            )
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def summarize_events(
+    request: YouTubeRequest, youtube: "YouTubeDataFetcher", index_store: "IndexStore"
+):
+    from api.replicate_api import llama3_8b, llama3_8b_stream
+    from src.summarizer import get_summary_prompt
+    from src.vectorstore import add_to_corpus_later, get_retriever
+
+    io_executor = app.state.io_executor
+    embed_executor = app.state.embed_executor
+    retriever_task = None
+    session_stored = False
+    try:
+        yield sse_event("status", {"stage": "fetch"})
+        meta_data = await io_executor.run(
+            youtube.get_meta_data, str(request.youtube_url)
+        )
+
+        yield sse_event("status", {"stage": "merge"})
+        chapter_transcript = await io_executor.run(merge_chapter_transcript, meta_data)
+
+        # Embed in the background while summary tokens stream back
+        yield sse_event("status", {"stage": "embedding"})
+        retriever_task = asyncio.ensure_future(
+            embed_executor.run(
+                get_retriever, meta_data, chapter_transcript, index_store
+            )
+        )
+
+        # Long transcripts are summarized section by section before the
+        # final reduce step, which is the one streamed to the client
+        with stage("summary_prompt"):
+            prompt = await get_summary_prompt(
+                meta_data, chapter_transcript, llama3_8b, io_executor
+            )
+
+        yield sse_event("status", {"stage": "summary"})
+        async for token in io_executor.iterate(
+            llama3_8b_stream, prompt, max_output_tokens(prompt)
+        ):
+            yield sse_event("token", {"text": token})
+
+        retriever, index_key = await asyncio.shield(retriever_task)
+        add_to_corpus_later(
+            meta_data, chapter_transcript, index_store.corpus_index, embed_executor
+        )
+        await asyncio.to_thread(
+            session_manager.set_session,
+            request.session_id,
+            {
+                "youtube_url": str(request.youtube_url),
+                "video_id": meta_data.video_id,
+                "title": meta_data.title,
+                "index_key": index_key,
+            },
+        )
+        session_manager.hold_index(request.session_id, index_key, retriever)
+        session_stored = True
+
+        yield sse_event(
+            "done",
+            {
+                "session_id": request.session_id,
+                "youtube_url": str(request.youtube_url),
+                "title": meta_data.title,
+                "channel_name": meta_data.channel_name,
+                "publish_date": meta_data.publish_date,
+            },
+        )
+
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        # Failed or disconnected streams must not keep the index referenced
+        if retriever_task is not None and not session_stored:
+            retriever_task.add_done_callback(
+                functools.partial(release_unclaimed_index, index_store)
+            )
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(
+    request: YouTubeRequest,
+    youtube=Depends(get_youtube_client),
+    index_store=Depends(get_index_store),
+):
+    return StreamingResponse(
+        summarize_events(request, youtube, index_store),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post(
+    "/summarize/batch",
+    response_model=BatchStatus,
+    dependencies=[Depends(wait_until_ready)],
+)
+async def summarize_batch(request: BatchRequest):
+    if not request.youtube_urls and not request.playlist_id:
+        raise HTTPException(
+            status_code=400, detail="Provide youtube_urls and/or playlist_id"
+        )
+
+    runner = app.state.batch_runner
+    job = runner.create_job()
+    runner.start(job, [str(url) for url in request.youtube_urls], request.playlist_id)
+    return BatchStatus(**job.to_dict())
+
+
+@app.get(
+    "/summarize/batch/{job_id}",
+    response_model=BatchStatus,
+    dependencies=[Depends(wait_until_ready)],
+)
+async def batch_status(job_id: str):
+    job = app.state.batch_runner.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return BatchStatus(**job.to_dict())
+
+
+@app.get("/summarize/batch/{job_id}/results", dependencies=[Depends(wait_until_ready)])
+async def batch_results(job_id: str):
+    job = app.state.batch_runner.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if not os.path.exists(job.output_path):
+        # Written once the job has resolved its videos; absent if it failed first
+        if job.finished_at is None:
+            raise HTTPException(
+                status_code=409, detail=f"Job {job_id} has no results yet"
+            )
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has no results")
+    return FileResponse(job.output_path, media_type="application/x-ndjson")
+
+
+@app.post(
+    "/jobs/summarize",
+    response_model=JobStatus,
+    status_code=202,
+    dependencies=[Depends(wait_until_ready)],
+)
+async def submit_summary_job(request: JobRequest):
+    """Queue a summary and return at once; poll /jobs/{job_id} or use a webhook."""
+    try:
+        job = await app.state.job_queue.submit(
+            str(request.youtube_url),
+            session_id=request.session_id,
+            webhook_url=str(request.webhook_url) if request.webhook_url else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobStatus(**job.to_dict())
+
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=JobStatus,
+    dependencies=[Depends(wait_until_ready)],
+)
+async def summary_job_status(job_id: str):
+    job = await app.state.job_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobStatus(**job.to_dict())
+
+
+def get_citations(documents, video_id: Optional[str]) -> List[Citation]:
+    """Timestamped links to the transcript chunks an answer was drawn from.
+
+    Sessions created before video IDs were stored cannot link, so get none.
+    """
+    if not video_id:
+        return []
+    citations = []
+    seen = set()
+    for document in documents:
+        start = document.metadata.get("start")
+        end = document.metadata.get("end")
+        if start is None or end is None or (start, end) in seen:
+            continue
+        seen.add((start, end))
+        citations.append(
+            Citation(
+                start=start,
+                end=end,
+                timestamp=seconds_to_hms(start),
+                chapter=document.metadata.get("chapter"),
+                url=f"https://www.youtube.com/watch?v={video_id}&t={int(start)}s",
+            )
+        )
+    return citations
 
 
-@app.post("/qa", response_model=QAResponse)
+@app.post("/qa", response_model=QAResponse, dependencies=[Depends(wait_until_ready)])
 async def question_answer(request: QuestionRequest):
-    session_data = session_manager.get_session(request.session_id)
-    if not session_data or not session_data.get("chat_chain"):
+    from src.chat import chat
+
+    session_data = await asyncio.to_thread(
+        session_manager.get_session, request.session_id
+    )
+    if not session_data or not session_data.get("index_key"):
         raise HTTPException(
             status_code=400,
             detail="Please summarize a YouTube video first for this session",
         )
 
     try:
-        chat_chain = session_data["chat_chain"]
-        chat_history = session_manager.get_chat_history(request.session_id)
+        chat_chain = await app.state.io_executor.run(
+            session_manager.get_chat_chain, request.session_id
+        )
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except KeyError:
+        # The session names an index that is not on this worker's disk
+        raise HTTPException(
+            status_code=410,
+            detail="The index for this session's video is gone; summarize it again",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if chat_chain is None:
+        raise HTTPException(status_code=400, detail="Session expired")
+
+    try:
+        chat_history = await asyncio.to_thread(
+            session_manager.get_chat_history, request.session_id
+        )
 
-        response, updated_history = chat(
-            request.user_question, chat_chain, chat_history
+        response, updated_history = await app.state.io_executor.run(
+            chat, request.user_question, chat_chain, chat_history
         )
 
-        session_manager.set_chat_history(request.session_id, updated_history)
+        await asyncio.to_thread(
+            session_manager.set_chat_history, request.session_id, updated_history
+        )
         return QAResponse(
-            response=response["answer"], youtube_url=session_data["youtube_url"]
+            response=response["answer"],
+            youtube_url=session_data["youtube_url"],
+            citations=get_citations(
+                response.get("source_documents", []), session_data.get("video_id")
+            ),
         )
 
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/video_info", response_model=VideoInfo)
-async def video_info(
-    youtube_url: str, youtube: YouTubeDataFetcher = Depends(get_youtube_client)
+@app.get("/search", response_model=SearchResponse)
+async def search(
+    query: str,
+    k: int = Query(10, ge=1, le=100),
+    channel: Optional[str] = None,
+    published_after: Optional[date] = None,
+    published_before: Optional[date] = None,
+    index_store=Depends(get_index_store),
 ):
+    """Rank transcript chunks from every indexed video, optionally filtered."""
+    corpus_index = index_store.corpus_index
+    if corpus_index is None:
+        raise HTTPException(status_code=503, detail="Cross-video search is disabled")
+
+    try:
+        hits = await app.state.embed_executor.run(
+            corpus_index.search,
+            query,
+            k,
+            channel,
+            str(published_after) if published_after else None,
+            str(published_before) if published_before else None,
+        )
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for hit in hits:
+        url = f"https://www.youtube.com/watch?v={hit.video_id}"
+        timestamp = None
+        if hit.start is not None:
+            url += f"&t={int(hit.start)}s"
+            timestamp = seconds_to_hms(hit.start)
+        results.append(SearchHit(**hit.to_dict(), timestamp=timestamp, url=url))
+    return SearchResponse(query=query, results=results)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latency, sizes, tokens, cache and proxy counters."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/cache/stats")
+async def cache_stats(youtube=Depends(get_youtube_client)):
+    from api.replicate_api import completion_cache
+
+    return {
+        "youtube": youtube.cache.stats(),
+        "completions": completion_cache.cache.stats(),
+    }
+
+
+@app.get("/quota")
+async def quota(youtube=Depends(get_youtube_client)):
+    return {"youtube_data_api_units": youtube.quota_stats()}
+
+
+@app.get("/proxies")
+async def proxies(youtube=Depends(get_youtube_client)):
+    if youtube.proxy_pool is None:
+        return {"proxies": []}
+    return {"proxies": youtube.proxy_pool.stats()}
+
+
+@app.get("/video_info", response_model=VideoInfo)
+async def video_info(youtube_url: str, youtube=Depends(get_youtube_client)):
     try:
-        meta_data = youtube.get_meta_data(youtube_url)
-        chapter_transcript = merge_chapter_transcript(meta_data)
+        io_executor = app.state.io_executor
+        meta_data = await io_executor.run(youtube.get_meta_data, youtube_url)
+        chapter_transcript = await io_executor.run(merge_chapter_transcript, meta_data)
         response = get_video_info(meta_data, chapter_transcript)
 
         return VideoInfo(video_info=str(response), youtube_url=youtube_url)
 
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
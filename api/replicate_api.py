@@ -1,23 +1,224 @@
 import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, Optional
+
 from dotenv import load_dotenv
+import httpx
 import replicate
+from replicate.exceptions import ReplicateError
+
+from utils.cache import Cache, get_cache
+from utils.metrics import OUTPUT_TOKENS, PROMPT_TOKENS, UPSTREAM_RETRIES, stage, timed
+from data.prompt_builder import count_tokens
 
 load_dotenv(override=True)
 api_token = os.getenv("REPLICATE_API_TOKEN")
 
+logger = logging.getLogger(__name__)
+
+REPLICATE_TIMEOUT = float(os.getenv("REPLICATE_TIMEOUT", 120))
+REPLICATE_MAX_CONNECTIONS = int(os.getenv("REPLICATE_MAX_CONNECTIONS", 64))
+REPLICATE_KEEPALIVE = float(os.getenv("REPLICATE_KEEPALIVE", 60))
+REPLICATE_MAX_RETRIES = int(os.getenv("REPLICATE_MAX_RETRIES", 3))
+REPLICATE_RETRY_BACKOFF = float(os.getenv("REPLICATE_RETRY_BACKOFF", 1))
+# Rate limiting and gateway errors; a failed prediction (ModelError) is final
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+LLAMA3_8B = "meta/meta-llama-3-8b-instruct"
+LLAMA3_8B_PARAMS = {"temperature": 0, "top_p": 1}
+
+
+class CompletionCache:
+    """Durable cache of deterministic completions with in-flight coalescing.
+
+    Concurrent callers asking for the same completion wait on a single
+    upstream call instead of each hitting Replicate.
+    """
+
+    def __init__(self, cache: Cache):
+        self.cache = cache
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, params: Dict[str, Any], prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+        payload = json.dumps(
+            {"model": model, "params": params, "prompt": prompt_hash}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = compute()
+            self.cache.set(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+completion_cache = CompletionCache(get_cache("completions"))
+
+
+_client: Optional[replicate.Client] = None
+_transport: Optional[httpx.HTTPTransport] = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
-def llama3_8b(prompt):
-    replicate_client = replicate.Client(api_token=api_token)
-    output = replicate_client.run(
-        "meta/meta-llama-3-8b-instruct",
-        input={"max_tokens": 2000, "temperature": 0, "top_p": 1, "prompt": prompt},
+def get_replicate_client() -> replicate.Client:
+    """Process-wide Replicate client over one pooled, keep-alive HTTP transport.
+
+    Created on first use (the app does this in `lifespan`) so each gunicorn
+    worker opens its own connections after the fork.
+    """
+    global _client, _transport
+    with _client_lock:
+        if _client is None:
+            _transport = httpx.HTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=REPLICATE_MAX_CONNECTIONS,
+                    max_keepalive_connections=REPLICATE_MAX_CONNECTIONS,
+                    keepalive_expiry=REPLICATE_KEEPALIVE,
+                ),
+                http2=_http2_available(),
+                # Connection failures only; run_model retries error statuses
+                retries=REPLICATE_MAX_RETRIES,
+            )
+            _client = replicate.Client(
+                api_token=api_token,
+                timeout=httpx.Timeout(REPLICATE_TIMEOUT, connect=10.0, pool=30.0),
+                transport=_transport,
+            )
+        return _client
+
+
+def close_replicate_client():
+    global _client, _transport
+    with _client_lock:
+        transport, _client, _transport = _transport, None, None
+    if transport is not None:
+        transport.close()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ReplicateError):
+        return error.status in RETRY_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def _backoff(model: str, attempt: int, error: Exception):
+    UPSTREAM_RETRIES.labels("replicate").inc()
+    delay = REPLICATE_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+    logger.warning(
+        f"Replicate call to {model} failed (attempt {attempt}): {error}; "
+        f"retrying in {delay:.1f}s"
     )
-    return "".join(output)
+    time.sleep(delay)
 
 
-def llama3_70b(prompt):
-    replicate_client = replicate.Client(api_token=api_token)
-    output = replicate_client.run(
-        "meta/meta-llama-3-70b-instruct", input={"max_tokens": 2000, "prompt": prompt}
+def run_model(model, params, prompt):
+    PROMPT_TOKENS.labels(model).observe(count_tokens(prompt))
+    for attempt in range(1, REPLICATE_MAX_RETRIES + 2):
+        try:
+            output = "".join(
+                get_replicate_client().run(model, input={**params, "prompt": prompt})
+            )
+            break
+        except Exception as e:
+            if attempt > REPLICATE_MAX_RETRIES or not _is_retryable(e):
+                raise
+            _backoff(model, attempt, e)
+    OUTPUT_TOKENS.labels(model).observe(count_tokens(output))
+    return output
+
+
+def stream_model(model, params, prompt) -> Iterator[str]:
+    PROMPT_TOKENS.labels(model).observe(count_tokens(prompt))
+    tokens = []
+    for attempt in range(1, REPLICATE_MAX_RETRIES + 2):
+        try:
+            events = get_replicate_client().stream(
+                model, input={**params, "prompt": prompt}
+            )
+            for event in events:
+                token = str(event)
+                if token:
+                    tokens.append(token)
+                    yield token
+            break
+        except Exception as e:
+            # Once tokens reached the caller a retry would repeat them
+            if tokens or attempt > REPLICATE_MAX_RETRIES or not _is_retryable(e):
+                raise
+            _backoff(model, attempt, e)
+    OUTPUT_TOKENS.labels(model).observe(count_tokens("".join(tokens)))
+
+
+def cached_run_model(model, params, prompt):
+    # Only deterministic (temperature 0) generations are safe to reuse
+    if params.get("temperature") != 0:
+        return run_model(model, params, prompt)
+    key = CompletionCache.key(model, params, prompt)
+    return completion_cache.get_or_compute(
+        key, lambda: run_model(model, params, prompt)
     )
-    return "".join(output)
+
+
+@timed("llama3_8b")
+def llama3_8b(prompt, max_tokens=2000):
+    params = {**LLAMA3_8B_PARAMS, "max_tokens": max_tokens}
+    return cached_run_model(LLAMA3_8B, params, prompt)
+
+
+def llama3_8b_stream(prompt, max_tokens=2000) -> Iterator[str]:
+    """Yield tokens as Replicate produces them; cached completions arrive whole."""
+    params = {**LLAMA3_8B_PARAMS, "max_tokens": max_tokens}
+    key = CompletionCache.key(LLAMA3_8B, params, prompt)
+    cached = completion_cache.cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    tokens = []
+    with stage("llama3_8b", stream=True):
+        for token in stream_model(LLAMA3_8B, params, prompt):
+            tokens.append(token)
+            yield token
+    completion_cache.cache.set(key, "".join(tokens))
+
+
+def llama3_70b(prompt):
+    return run_model("meta/meta-llama-3-70b-instruct", {"max_tokens": 2000}, prompt)
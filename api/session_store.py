@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.index_store import IndexStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSessionBackend:
+    """Process-local session records, ordered from least to most recently used."""
+
+    def __init__(self):
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is not None:
+                self._records.move_to_end(session_id)
+                self._access[session_id] = time.time()
+            return record
+
+    def set(self, session_id: str, record: Dict[str, Any]):
+        with self._lock:
+            self._store(session_id, record)
+
+    def update(
+        self,
+        session_id: str,
+        fields: Dict[str, Any],
+        default: Callable[[], Dict[str, Any]],
+    ):
+        """Merge `fields` into the record (or `default()`) atomically."""
+        with self._lock:
+            record = self._records.get(session_id) or default()
+            record.update(fields)
+            self._store(session_id, record)
+
+    def _store(self, session_id: str, record: Dict[str, Any]):
+        size = len(json.dumps(record))
+        self._records[session_id] = record
+        self._records.move_to_end(session_id)
+        self._access[session_id] = time.time()
+        self._total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._records.pop(session_id, None)
+            self._access.pop(session_id, None)
+            self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def exists(self, session_id: str) -> bool:
+        return session_id in self._records
+
+    def lru(self) -> List[str]:
+        with self._lock:
+            return list(self._records)
+
+    def last_access(self, session_id: str) -> Optional[float]:
+        return self._access.get(session_id)
+
+    def sizes(self, session_ids: List[str]) -> List[int]:
+        return [self._sizes.get(session_id, 0) for session_id in session_ids]
+
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._records)
+
+
+class RedisSessionBackend:
+    """Session records shared by every worker through a Redis-protocol server.
+
+    Records are JSON strings that expire after the idle timeout since they
+    were last read or written; a sorted set orders sessions by last access for
+    LRU eviction. Calls block on the network, so async callers run them in a
+    thread.
+    """
+
+    KEY_PREFIX = "session:"
+    LRU_KEY = "sessions:lru"
+
+    def __init__(self, url: str, idle_timeout: float):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.idle_timeout = int(idle_timeout)
+        self._watch_error = redis.WatchError
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        key = self.KEY_PREFIX + session_id
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        # Reading a session counts as activity, like writing it
+        pipe.expire(key, self.idle_timeout)
+        pipe.zadd(self.LRU_KEY, {session_id: time.time()})
+        value = pipe.execute()[0]
+        if value is None:
+            self.client.zrem(self.LRU_KEY, session_id)
+            return None
+        return json.loads(value)
+
+    def set(self, session_id: str, record: Dict[str, Any]):
+        pipe = self.client.pipeline()
+        pipe.set(self.KEY_PREFIX + session_id, json.dumps(record), ex=self.idle_timeout)
+        pipe.zadd(self.LRU_KEY, {session_id: time.time()})
+        pipe.execute()
+
+    def update(
+        self,
+        session_id: str,
+        fields: Dict[str, Any],
+        default: Callable[[], Dict[str, Any]],
+    ):
+        """Merge `fields` into the record (or `default()`), retrying on conflict.
+
+        WATCH makes the write fail if another worker changed the record after
+        it was read, so concurrent updates of one session never drop a field.
+        """
+        key = self.KEY_PREFIX + session_id
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    value = pipe.get(key)
+                    record = json.loads(value) if value is not None else default()
+                    record.update(fields)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(record), ex=self.idle_timeout)
+                    pipe.zadd(self.LRU_KEY, {session_id: time.time()})
+                    pipe.execute()
+                    return
+                except self._watch_error:
+                    continue
+
+    def delete(self, session_id: str):
+        pipe = self.client.pipeline()
+        pipe.delete(self.KEY_PREFIX + session_id)
+        pipe.zrem(self.LRU_KEY, session_id)
+        pipe.execute()
+
+    def exists(self, session_id: str) -> bool:
+        return bool(self.client.exists(self.KEY_PREFIX + session_id))
+
+    def lru(self) -> List[str]:
+        return [key.decode() for key in self.client.zrange(self.LRU_KEY, 0, -1)]
+
+    def last_access(self, session_id: str) -> Optional[float]:
+        return self.client.zscore(self.LRU_KEY, session_id)
+
+    def sizes(self, session_ids: List[str]) -> List[int]:
+        pipe = self.client.pipeline()
+        for session_id in session_ids:
+            pipe.strlen(self.KEY_PREFIX + session_id)
+        return pipe.execute()
+
+    def total_bytes(self) -> int:
+        return sum(self.sizes(self.lru()))
+
+    def __len__(self):
+        return self.client.zcard(self.LRU_KEY)
+
+
+def get_session_backend(idle_timeout: float):
+    """Build the backend configured by SESSION_BACKEND (local or redis)."""
+    backend = os.getenv("SESSION_BACKEND", "local")
+    if backend == "local":
+        return LocalSessionBackend()
+    if backend == "redis":
+        return RedisSessionBackend(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"), idle_timeout
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+
+class SessionManager:
+    """Bounded session store with LRU eviction.
+
+    Session records hold only small, serializable data (URL, index key, chat
+    history) in the backend. Retrievers and chat chains are shared per video
+    in this process and looked up through the session's index key.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        index_store: Optional["IndexStore"] = None,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_index_bytes: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        idle_timeout = idle_timeout or float(os.getenv("SESSION_IDLE_TIMEOUT", 3600))
+        # Cleanup after 1 hour of inactivity by default
+        self.cleanup_interval = timedelta(seconds=idle_timeout)
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX", 1000))
+        # Session records, counted across every worker sharing the backend
+        self.max_bytes = max_bytes or int(os.getenv("SESSION_MAX_BYTES", 512 * 2**20))
+        # Indexes loaded by this process
+        self.max_index_bytes = max_index_bytes or int(
+            os.getenv("SESSION_MAX_INDEX_BYTES", 512 * 2**20)
+        )
+        if backend is None:
+            backend = get_session_backend(idle_timeout)
+        self.backend = backend
+        self.index_store = index_store
+        # Index keys this process holds a reference to, per session
+        self._held: Dict[str, str] = {}
+        self._chains: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def create_session(self) -> str:
+        session_id = str(uuid.uuid4())
+        self.backend.set(session_id, self._new_record())
+        return session_id
+
+    @staticmethod
+    def _new_record() -> Dict[str, Any]:
+        return {"data": {}, "chat_history": []}
+
+    def _update(self, session_id: str, **fields):
+        self.backend.update(session_id, fields, self._new_record)
+
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        record = self.backend.get(session_id)
+        return record["data"] if record else {}
+
+    def set_session(self, session_id: str, data: Dict[str, Any]):
+        self._update(session_id, data=data)
+
+    def get_chat_history(self, session_id: str) -> List:
+        record = self.backend.get(session_id)
+        # JSON turns tuples into lists; the chat chain expects tuples
+        return [tuple(turn) for turn in record["chat_history"]] if record else []
+
+    def set_chat_history(self, session_id: str, history: List):
+        self._update(session_id, chat_history=history)
+
+    def hold_index(self, session_id: str, index_key: str, retriever):
+        """Record that `session_id` uses an index this process already acquired."""
+        from src.chat import get_chat_chain
+
+        with self._lock:
+            previous = self._held.pop(session_id, None)
+            self._held[session_id] = index_key
+            if index_key not in self._chains:
+                self._chains[index_key] = get_chat_chain(retriever)
+        self._release(previous)
+
+    def get_chat_chain(self, session_id: str):
+        """Return the shared chat chain for the session's video.
+
+        Loads the video's index if no session holds it yet.
+        """
+        index_key = self.get_session(session_id).get("index_key")
+        if index_key is None:
+            return None
+        with self._lock:
+            if self._held.get(session_id) == index_key:
+                return self._chains[index_key]
+
+        from src.vectorstore import as_retriever
+
+        # Another worker summarized this session; load the index from shared disk
+        vectorstore = self.index_store.acquire(index_key)
+        self.hold_index(session_id, index_key, as_retriever(vectorstore))
+        return self._chains[index_key]
+
+    def _release(self, index_key: Optional[str]):
+        if index_key is None or self.index_store is None:
+            return
+        with self._lock:
+            self.index_store.release(index_key)
+            if self.index_store.refcount(index_key) == 0:
+                self._chains.pop(index_key, None)
+
+    def _unhold(self, session_id: str):
+        """Drop this process's index reference for `session_id`, keeping the session."""
+        with self._lock:
+            index_key = self._held.pop(session_id, None)
+        self._release(index_key)
+
+    def end_session(self, session_id: str):
+        self.backend.delete(session_id)
+        self._unhold(session_id)
+
+    def total_bytes(self) -> int:
+        """Bytes of session records in the backend, across every worker."""
+        return self.backend.total_bytes()
+
+    def index_bytes(self) -> int:
+        """Bytes of indexes loaded by this process."""
+        return self.index_store.memory_bytes() if self.index_store else 0
+
+    def cleanup_old_sessions(self):
+        cutoff = time.time() - self.cleanup_interval.total_seconds()
+        for session_id in self.backend.lru():
+            last_access = self.backend.last_access(session_id)
+            if last_access is not None and last_access >= cutoff:
+                break
+            self.end_session(session_id)
+
+        # Release local references to sessions another worker or Redis expired
+        with self._lock:
+            held = list(self._held)
+        for session_id in held:
+            if not self.backend.exists(session_id):
+                self.end_session(session_id)
+
+    def evict(self):
+        """Drop least recently used sessions until within the count and byte budgets.
+
+        Session sizes are read once, so a Redis backend costs a fixed number
+        of round trips plus one per evicted session. Loaded indexes are this
+        worker's own memory: above `max_index_bytes` it releases its index
+        references, least recently used first, but keeps the sessions, which
+        reload their index on their next question.
+        """
+        lru = self.backend.lru()
+        sizes = self.backend.sizes(lru)
+        session_bytes = sum(sizes)
+        evicted = 0
+        while evicted < len(lru) and (
+            len(lru) - evicted > self.max_sessions or session_bytes > self.max_bytes
+        ):
+            self.end_session(lru[evicted])
+            session_bytes -= sizes[evicted]
+            evicted += 1
+
+        released = 0
+        with self._lock:
+            held = set(self._held)
+        for session_id in lru[evicted:]:
+            if session_id not in held:
+                continue
+            if self.index_bytes() <= self.max_index_bytes:
+                break
+            self._unhold(session_id)
+            released += 1
+        if evicted or released:
+            logger.info(
+                f"Evicted {evicted} sessions, released indexes of {released} more"
+            )
+
+    async def run_eviction(self, interval: float):
+        """Periodically expire idle sessions and enforce the budgets."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.cleanup_old_sessions)
+                await asyncio.to_thread(self.evict)
+            except Exception as e:
+                logger.error(f"Session eviction failed: {e}")
@@ -0,0 +1,325 @@
+"""End-to-end /summarize and /qa benchmark against stubbed external services.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_api --profiles short long --concurrency 1 4 16
+    python -m benchmarks.bench_api --output results.json
+    python -m benchmarks.bench_api --baseline results.json --tolerance 0.25
+
+The app runs in-process with its real executors, caches and indexes; only
+YouTube, the transcript API, Replicate and (by default) the embedding model
+are replaced by stubs from benchmarks/stubs.py with the configured latency.
+With --baseline, the run fails if any p95 latency regressed beyond the
+tolerance.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import itertools
+import platform
+import resource
+import tempfile
+from typing import Dict, List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", help="Fixtures to run (default all)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=8, help="Sessions per level")
+    parser.add_argument("--qa-per-session", type=int, default=2)
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Reuse one video ID and keep caches, not a cold pipeline per request",
+    )
+    parser.add_argument(
+        "--embeddings",
+        choices=["hash", "model"],
+        default="hash",
+        help="Stub hashing embeddings or the real EMBEDDING_MODEL",
+    )
+    parser.add_argument("--youtube-latency", type=float, default=0.1)
+    parser.add_argument("--transcript-latency", type=float, default=0.3)
+    parser.add_argument("--llm-first-token", type=float, default=0.5)
+    parser.add_argument("--llm-per-token", type=float, default=0.005)
+    parser.add_argument("--llm-output-tokens", type=int, default=200)
+    parser.add_argument("--embedding-latency", type=float, default=0.001)
+    parser.add_argument("--output", help="Write JSON results here")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser.parse_args()
+
+
+def configure_environment(args, index_dir: str):
+    # Must run before the app is imported: several settings are read at import
+    os.environ.update(
+        YOUTUBE_API_TOKEN="benchmark",
+        REPLICATE_API_TOKEN="benchmark",
+        ENVIRONMENT="local",
+        INDEX_DIR=index_dir,
+        CACHE_BACKEND="memory",
+        # The embedding cache is always on disk; keep it out of the repository
+        CACHE_DIR=index_dir,
+        SESSION_BACKEND="local",
+        JOB_BROKER="local",
+    )
+    if not args.warm:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+        os.environ["EMBEDDING_CACHE_MAX_ENTRIES"] = "0"
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    return {
+        "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+        "p50": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99": round(percentile(latencies, 0.99) * 1000, 1),
+        "max": round(max(latencies) * 1000, 1),
+    }
+
+
+def stage_totals() -> Dict[str, List[float]]:
+    from utils.metrics import STAGE_SECONDS
+
+    totals: Dict[str, List[float]] = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                totals.setdefault(stage, [0.0, 0.0])[0] = sample.value
+            elif sample.name.endswith("_count"):
+                totals.setdefault(stage, [0.0, 0.0])[1] = sample.value
+    return totals
+
+
+def stage_delta(before, after) -> Dict[str, Dict[str, float]]:
+    stages = {}
+    for stage, (total, count) in after.items():
+        previous_total, previous_count = before.get(stage, (0.0, 0.0))
+        calls = count - previous_count
+        if calls:
+            stages[stage] = {
+                "calls": int(calls),
+                "mean_ms": round((total - previous_total) / calls * 1000, 1),
+            }
+    return stages
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+async def timed_requests(calls, concurrency: int):
+    """Run request coroutines with bounded concurrency.
+
+    Returns the latencies, the errors and the wall time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one(call):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(f"{response.status_code}: {response.text[:200]}")
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(one(call) for call in calls))
+    return responses, latencies, errors, time.perf_counter() - start
+
+
+def phase_result(endpoint, profile, concurrency, latencies, errors, wall, before):
+    return {
+        "endpoint": endpoint,
+        "profile": profile,
+        "concurrency": concurrency,
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "latency_ms": latency_summary(latencies),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "stages": stage_delta(before, stage_totals()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_level(client, catalog, profile, concurrency, args, counter):
+    youtube_urls = []
+    for _ in range(args.requests):
+        n = 0 if args.warm else next(counter)
+        youtube_urls.append(
+            f"https://www.youtube.com/watch?v={catalog.video_id(profile, n)}"
+        )
+
+    session_ids = []
+    for _ in youtube_urls:
+        response = await client.post("/create_session")
+        session_ids.append(response.json()["session_id"])
+
+    before = stage_totals()
+    responses, latencies, errors, wall = await timed_requests(
+        [
+            lambda url=url, session_id=session_id: client.post(
+                "/summarize", json={"youtube_url": url, "session_id": session_id}
+            )
+            for url, session_id in zip(youtube_urls, session_ids)
+        ],
+        concurrency,
+    )
+    summarize = phase_result(
+        "summarize", profile, concurrency, latencies, errors, wall, before
+    )
+
+    ready = [
+        session_id
+        for session_id, response in zip(session_ids, responses)
+        if response.status_code == 200
+    ]
+    before = stage_totals()
+    _, latencies, errors, wall = await timed_requests(
+        [
+            lambda session_id=session_id, i=i: client.post(
+                "/qa",
+                json={
+                    "session_id": session_id,
+                    "user_question": f"What is said about topic {i}?",
+                },
+            )
+            for session_id in ready
+            for i in range(args.qa_per_session)
+        ],
+        concurrency,
+    )
+    qa = phase_result("qa", profile, concurrency, latencies, errors, wall, before)
+    return [summarize, qa]
+
+
+async def run(args) -> List[Dict]:
+    import httpx
+
+    from api.app import app
+    from benchmarks.fixtures import load_fixtures
+    from benchmarks.stubs import FixtureCatalog, HashEmbeddings, Latency, install
+
+    latency = Latency(
+        youtube=args.youtube_latency,
+        transcript=args.transcript_latency,
+        llm_first_token=args.llm_first_token,
+        llm_per_token=args.llm_per_token,
+        llm_output_tokens=args.llm_output_tokens,
+        embedding=args.embedding_latency,
+    )
+    fixtures = load_fixtures()
+    catalog = FixtureCatalog(fixtures)
+    embeddings = HashEmbeddings(latency=latency) if args.embeddings == "hash" else None
+    install(catalog, latency, embeddings)
+
+    profiles = args.profiles or list(fixtures)
+    counter = itertools.count(1)
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=None
+        ) as client:
+            # Services load in the background; measure only once they are ready
+            while True:
+                response = await client.get("/health/ready")
+                if response.status_code == 200:
+                    break
+                if response.json()["status"] == "failed":
+                    raise SystemExit(
+                        f"App failed to start: {response.json()['detail']}"
+                    )
+                await asyncio.sleep(0.1)
+            for profile in profiles:
+                for concurrency in args.concurrency:
+                    level = await run_level(
+                        client, catalog, profile, concurrency, args, counter
+                    )
+                    for result in level:
+                        print(
+                            f"{result['endpoint']:>9} {profile:>12} "
+                            f"c={concurrency:<3} "
+                            f"p50={result['latency_ms'].get('p50', 0):>8.1f}ms "
+                            f"p95={result['latency_ms'].get('p95', 0):>8.1f}ms "
+                            f"{result['throughput_rps']:>7.2f} req/s "
+                            f"errors={result['errors']} rss={result['peak_rss_mb']}MB"
+                        )
+                    results.extend(level)
+    return results
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {
+            (r["endpoint"], r["profile"], r["concurrency"]): r
+            for r in json.load(f)["results"]
+        }
+    regressions = []
+    for result in results:
+        key = (result["endpoint"], result["profile"], result["concurrency"])
+        previous = baseline.get(key)
+        if not previous or not previous["latency_ms"] or not result["latency_ms"]:
+            continue
+        old, new = previous["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if new > old * (1 + tolerance):
+            regressions.append(
+                f"{key[0]} {key[1]} c={key[2]}: p95 {old:.1f}ms -> {new:.1f}ms"
+            )
+    return regressions
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory(prefix="bench-index-") as index_dir:
+        configure_environment(args, index_dir)
+        results = asyncio.run(run(args))
+
+    report = {
+        "benchmark": "api",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": vars(args),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
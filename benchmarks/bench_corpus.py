@@ -0,0 +1,165 @@
+"""Cross-video corpus index benchmark: append cost as the corpus grows, and search.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_corpus
+    python -m benchmarks.bench_corpus --videos 200 --index-type hnsw
+    python -m benchmarks.bench_corpus --max-append-growth 3 --output corpus.json
+
+Synthetic videos of --chunks-per-video chunks (clustered vectors, as in
+bench_index) are appended one at a time to a fresh src/corpus_index.py index.
+Appends must stay incremental: the last tenth of the videos should not take
+much longer to add than the first tenth, and --max-append-growth fails the run
+if their ratio exceeds it. Searches are then timed unfiltered and filtered
+to one channel, and the index is reopened from its snapshot.
+"""
+
+import sys
+import json
+import time
+import tempfile
+import argparse
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.bench_index import clustered_vectors, percentile
+from src.corpus_index import CorpusIndex
+
+
+class VectorService:
+    """Hands out precomputed vectors in place of EmbeddingService."""
+
+    def __init__(self, vectors: np.ndarray, queries: np.ndarray):
+        self.vectors = vectors
+        self.offset = 0
+        self.embeddings = SimpleNamespace(
+            embedding_id="benchmark-corpus",
+            embed_query=lambda text: queries[int(text)],
+        )
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.vectors[self.offset : self.offset + len(texts)].copy()
+        self.offset += len(texts)
+        return vectors
+
+
+def mean_ms(values: List[float]) -> float:
+    return round(float(np.mean(values)) * 1000, 2)
+
+
+def time_searches(corpus: CorpusIndex, count: int, top_k: int, **filters) -> Dict:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        corpus.search(str(i), top_k, **filters)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=100)
+    parser.add_argument("--chunks-per-video", type=int, default=300)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--index-type", choices=["flat", "hnsw"], default="flat")
+    parser.add_argument("--storage", choices=["fp32", "fp16", "int8"], default="fp16")
+    parser.add_argument("--metric", choices=["l2", "ip"], default="l2")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--max-append-growth",
+        type=float,
+        help="Fail if late appends take this many times longer than early ones",
+    )
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args()
+
+    total = args.videos * args.chunks_per_video
+    vectors = clustered_vectors(total + args.queries, args.dimension)
+    service = VectorService(vectors[:total], vectors[total:])
+    documents = [
+        Document(page_content=f"chunk {i}", metadata={"start": i * 10.0})
+        for i in range(args.chunks_per_video)
+    ]
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = CorpusIndex(
+            service, corpus_dir, args.index_type, args.storage, args.metric
+        )
+        appends = []
+        for v in range(args.videos):
+            meta_data = SimpleNamespace(
+                video_id=f"video{v:06d}",
+                title=f"Video {v}",
+                channel_name=f"channel{v % args.channels}",
+                publish_date=f"2024-01-{v % 28 + 1:02d}",
+            )
+            start = time.perf_counter()
+            corpus.add_video(meta_data, documents)
+            appends.append(time.perf_counter() - start)
+
+        tenth = max(1, args.videos // 10)
+        result = {
+            "index": corpus.stats()["index"],
+            "videos": args.videos,
+            "chunks": total,
+            "append_ms_first": mean_ms(appends[:tenth]),
+            "append_ms_last": mean_ms(appends[-tenth:]),
+            "index_mb": round(corpus.stats()["index_bytes"] / 2**20, 1),
+            "search": time_searches(corpus, args.queries, args.top_k),
+            "search_one_channel": time_searches(
+                corpus, args.queries, args.top_k, channel="channel0"
+            ),
+        }
+        result["append_growth"] = round(
+            result["append_ms_last"] / result["append_ms_first"], 2
+        )
+        corpus.close()
+
+        start = time.perf_counter()
+        CorpusIndex(service, corpus_dir, args.index_type, args.storage, args.metric)
+        result["reopen_seconds"] = round(time.perf_counter() - start, 3)
+
+    print(
+        f"{result['index']}: {args.videos} videos, {total} chunks, "
+        f"{result['index_mb']} MB\n"
+        f"  append first={result['append_ms_first']}ms "
+        f"last={result['append_ms_last']}ms (x{result['append_growth']})\n"
+        f"  search p50={result['search']['p50_ms']}ms "
+        f"p95={result['search']['p95_ms']}ms; one channel "
+        f"p50={result['search_one_channel']['p50_ms']}ms "
+        f"p95={result['search_one_channel']['p95_ms']}ms\n"
+        f"  reopen={result['reopen_seconds']}s"
+    )
+
+    if args.output:
+        report = {
+            "benchmark": "corpus",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "config": vars(args),
+            "result": result,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if (
+        args.max_append_growth is not None
+        and result["append_growth"] > args.max_append_growth
+    ):
+        print(
+            f"REGRESSION appends slowed x{result['append_growth']} "
+            f"> x{args.max_append_growth} as the corpus grew"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Embedding backend benchmark: throughput, memory and retrieval quality.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_embeddings
+    python -m benchmarks.bench_embeddings --configs mpnet:torch minilm:onnx-int8
+    python -m benchmarks.bench_embeddings --fixtures interview --output embeddings.json
+
+Each config is a `model:backend` pair (see EMBEDDING_MODEL and
+EMBEDDING_BACKEND) and runs in a fresh interpreter, so load time and RSS
+are its own. Chunks come from recorded transcripts in benchmarks/recorded/
+(synthetic ones if none are recorded), split exactly as the API splits them.
+
+Retrieval quality is measured without labels. Queries are word spans taken
+from chunks; `recall@k` is how often the chunk a query came from is in the
+top k, and `overlap@k` is how much of the first config's top k each other
+config also returns.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+
+
+DEFAULT_CONFIGS = [
+    "mpnet:torch",
+    "mpnet:onnx",
+    "mpnet:onnx-int8",
+    "minilm:torch",
+    "minilm:onnx-int8",
+]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def load_chunks(names: List[str]) -> List[str]:
+    from benchmarks.fixtures import RECORDED_DIR, load_fixtures
+    from data.get_youtube_data import YouTubeDataFetcher
+    from data.preprocess import merge_chapter_transcript
+    from src.vectorstore import split_transcript
+
+    fixtures = load_fixtures()
+    if not names:
+        names = [path.stem for path in sorted(RECORDED_DIR.glob("*.json"))]
+    if not names:
+        print("No recorded transcripts, using the synthetic 'medium' fixture")
+        names = ["medium"]
+
+    chunks = []
+    for name in names:
+        fixture = fixtures[name]
+        description = fixture.snippet["description"]
+        meta_data = SimpleNamespace(
+            transcript={"transcript": fixture.transcript},
+            chapters=YouTubeDataFetcher.extract_chapters(description),
+        )
+        chapter_transcript = merge_chapter_transcript(meta_data)
+        chunks.extend(doc.page_content for doc in split_transcript(chapter_transcript))
+    return chunks
+
+
+def make_queries(chunks: List[str], count: int, seed: int = 0):
+    """Word spans from random chunks, paired with the index of their chunk."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        target = rng.randrange(len(chunks))
+        words = chunks[target].split()
+        length = min(len(words), rng.randint(6, 12))
+        start = rng.randint(0, len(words) - length)
+        queries.append((" ".join(words[start : start + length]), target))
+    return queries
+
+
+def run_config(config: str, chunks: List[str], queries, top_k: int) -> Dict:
+    """Measure one backend in this process."""
+    from src.embeddings import EmbeddingEngine
+
+    model, backend = config.split(":")
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    engine = EmbeddingEngine(model_name=model, backend=backend)
+    load_seconds = time.perf_counter() - start
+    engine.warm_up()
+
+    start = time.perf_counter()
+    vectors = engine.embed_array(chunks)
+    embed_seconds = time.perf_counter() - start
+    query_vectors = engine.embed_array([query for query, _ in queries])
+
+    # Cosine similarity; exact search so only the embeddings differ
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    top = np.argsort(-query_vectors @ vectors.T, axis=1)[:, :top_k]
+    return {
+        "config": config,
+        "embedding_id": engine.embedding_id,
+        "dimension": int(vectors.shape[1]),
+        "load_seconds": round(load_seconds, 2),
+        "chunks_per_second": round(len(chunks) / embed_seconds, 1),
+        "rss_mb": round(peak_rss_mb() - rss_before, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        f"recall@{top_k}": round(
+            float(np.mean([target in row for (_, target), row in zip(queries, top)])),
+            3,
+        ),
+        "top_ids": top.tolist(),
+    }
+
+
+def run_in_subprocess(config: str, args) -> Dict:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.bench_embeddings",
+        "--worker",
+        config,
+        "--queries",
+        str(args.queries),
+        "--top-k",
+        str(args.top_k),
+        "--fixtures",
+        *args.fixtures,
+    ]
+    process = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()
+        return {"config": config, "error": error[-1] if error else "failed"}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def overlap(reference: List[List[int]], candidate: List[List[int]]) -> float:
+    shared = [len(set(a) & set(b)) / len(a) for a, b in zip(reference, candidate)]
+    return round(float(np.mean(shared)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument(
+        "--fixtures", nargs="*", default=[], help="Fixture names (default recorded)"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", help="Write JSON results here")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        chunks = load_chunks(args.fixtures)
+        queries = make_queries(chunks, args.queries)
+        print(json.dumps(run_config(args.worker, chunks, queries, args.top_k)))
+        return
+
+    results = [run_in_subprocess(config, args) for config in args.configs]
+    reference = next((r for r in results if "error" not in r), None)
+    for result in results:
+        if "error" in result:
+            print(f"{result['config']:>20}  failed: {result['error']}")
+            continue
+        result[f"overlap@{args.top_k}"] = overlap(
+            reference["top_ids"], result["top_ids"]
+        )
+        result["speedup"] = round(
+            result["chunks_per_second"] / reference["chunks_per_second"], 2
+        )
+        print(
+            f"{result['config']:>20}  {result['chunks_per_second']:>8.1f} chunks/s "
+            f"x{result['speedup']:<5} load={result['load_seconds']:>5.1f}s "
+            f"rss=+{result['rss_mb']}MB "
+            f"recall@{args.top_k}={result[f'recall@{args.top_k}']:.3f} "
+            f"overlap@{args.top_k}={result[f'overlap@{args.top_k}']:.3f}"
+        )
+
+    if args.output:
+        report = {
+            "benchmark": "embeddings",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "reference": reference["config"] if reference else None,
+            "results": [
+                {key: value for key, value in result.items() if key != "top_ids"}
+                for result in results
+            ],
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""FAISS index layout benchmark: memory per video, query latency and recall.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_index
+    python -m benchmarks.bench_index --sizes 600 50000 --metric ip --min-recall 0.9
+    python -m benchmarks.bench_index --vectors chunks.npy --output index.json
+
+Each layout from src/index_factory.py is built over the same vectors and
+queried with held-out vectors. Recall@k is measured against exact fp32
+search. Vectors default to a synthetic mixture that, like sentence
+embeddings, is clustered and low-rank rather than uniform. Pass --vectors with
+a saved float32 array of real embeddings to measure those instead. With
+--min-recall, the run fails if any layout's recall drops below it.
+"""
+
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from src.index_factory import IVFPQ_MIN_TRAIN, build_index, index_bytes
+
+
+# (name, INDEX_TYPE, INDEX_STORAGE)
+LAYOUTS = [
+    ("flat-fp32", "flat", "fp32"),
+    ("flat-fp16", "flat", "fp16"),
+    ("hnsw-fp16", "hnsw", "fp16"),
+    ("ivfpq", "ivfpq", "fp16"),
+]
+
+
+def clustered_vectors(
+    count: int, dimension: int, latent: int = 64, seed: int = 0
+) -> np.ndarray:
+    """Topic clusters in a low-dimensional space, projected up with a little noise.
+
+    Sentence embeddings also occupy a low-dimensional subspace, which is what
+    lets PQ codes and HNSW graphs approximate them well.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, count // 200), latent))
+    points = centers[rng.integers(len(centers), size=count)]
+    points += 0.5 * rng.standard_normal((count, latent))
+    projection = rng.standard_normal((latent, dimension)) / np.sqrt(latent)
+    vectors = points @ projection + 0.05 * rng.standard_normal((count, dimension))
+    return vectors.astype(np.float32)
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q * 100))
+
+
+def measure(name, index_type, storage, metric, corpus, queries, truth, args) -> Dict:
+    start = time.perf_counter()
+    index = build_index(corpus.copy(), index_type, storage, metric)
+    build_seconds = time.perf_counter() - start
+    if metric == "ip":
+        queries = queries.copy()
+        faiss.normalize_L2(queries)
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], args.fetch_k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0, : args.top_k])
+    recall = np.mean(
+        [len(set(row) & set(exact)) / args.top_k for row, exact in zip(found, truth)]
+    )
+    bytes_per_vector = index_bytes(index) / len(corpus)
+    return {
+        "layout": name,
+        "index": type(faiss.downcast_index(index)).__name__,
+        "vectors": len(corpus),
+        "build_seconds": round(build_seconds, 3),
+        "bytes_per_vector": round(bytes_per_vector, 1),
+        "video_kb": round(bytes_per_vector * args.chunks_per_video / 1024, 1),
+        "query_ms_p50": round(percentile(latencies, 0.50) * 1000, 3),
+        "query_ms_p95": round(percentile(latencies, 0.95) * 1000, 3),
+        f"recall@{args.top_k}": round(float(recall), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[600, 20_000, 100_000])
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--vectors", help="Float32 .npy array of real embeddings")
+    parser.add_argument("--metric", choices=["l2", "ip"], default="l2")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--fetch-k", type=int, default=20, help="Candidates per query, as MMR fetches"
+    )
+    parser.add_argument(
+        "--chunks-per-video",
+        type=int,
+        default=600,
+        help="Chunks per video for the memory column; 600 is about 4 hours",
+    )
+    parser.add_argument("--min-recall", type=float, help="Fail below this recall")
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args()
+
+    source = np.load(args.vectors).astype(np.float32) if args.vectors else None
+    results = []
+    for size in args.sizes:
+        if source is not None:
+            if size + args.queries > len(source):
+                print(f"Skipping {size}: only {len(source)} vectors in {args.vectors}")
+                continue
+            vectors = source[: size + args.queries].copy()
+        else:
+            vectors = clustered_vectors(size + args.queries, args.dimension)
+        corpus, queries = vectors[:size], vectors[size:]
+
+        exact = faiss.IndexFlat(corpus.shape[1], faiss.METRIC_L2)
+        if args.metric == "ip":
+            exact = faiss.IndexFlat(corpus.shape[1], faiss.METRIC_INNER_PRODUCT)
+            corpus_exact, queries_exact = corpus.copy(), queries.copy()
+            faiss.normalize_L2(corpus_exact)
+            faiss.normalize_L2(queries_exact)
+        else:
+            corpus_exact, queries_exact = corpus, queries
+        exact.add(corpus_exact)
+        _, truth = exact.search(queries_exact, args.top_k)
+
+        for name, index_type, storage in LAYOUTS:
+            if index_type == "ivfpq" and size < IVFPQ_MIN_TRAIN:
+                continue
+            result = measure(
+                name, index_type, storage, args.metric, corpus, queries, truth, args
+            )
+            results.append(result)
+            print(
+                f"{size:>8} {name:>10}  {result['bytes_per_vector']:>7.1f} B/vector "
+                f"{result['video_kb']:>7.1f} KB/video "
+                f"p50={result['query_ms_p50']:>7.3f}ms "
+                f"p95={result['query_ms_p95']:>7.3f}ms "
+                f"recall@{args.top_k}={result[f'recall@{args.top_k}']:.3f} "
+                f"build={result['build_seconds']:.2f}s"
+            )
+
+    if args.output:
+        report = {
+            "benchmark": "index",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "config": vars(args),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.min_recall is not None:
+        failures = [r for r in results if r[f"recall@{args.top_k}"] < args.min_recall]
+        for r in failures:
+            print(
+                f"REGRESSION {r['layout']} over {r['vectors']} vectors: "
+                f"recall@{args.top_k} {r[f'recall@{args.top_k}']} < {args.min_recall}"
+            )
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
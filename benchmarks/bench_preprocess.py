@@ -0,0 +1,157 @@
+"""Micro-benchmark for transcript cleaning, chapter parsing and assignment.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_preprocess --segments 10000 50000
+
+Synthetic transcripts at these sizes run for many hours, so chapters use
+H:MM:SS timestamps; each run also checks that every chapter receives the
+same segments as a reference assignment over the true chapter offsets.
+"""
+
+import re
+import random
+import argparse
+import timeit
+from types import SimpleNamespace
+
+from data.preprocess import ChapterTranscript, merge_chapter_transcript
+from utils.helpers import seconds_to_hms
+
+
+WORDS = (
+    "the video talks about markets rates inflation earnings and the [Music] outlook"
+).split()
+
+
+def make_meta_data(num_segments, num_chapters, seed=0):
+    rng = random.Random(seed)
+    transcript = []
+    start = 0.0
+    for _ in range(num_segments):
+        duration = rng.uniform(1.0, 5.0)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        # Dashes in the text broke the old "start - text" round trip
+        if rng.random() < 0.05:
+            text += " - well-known"
+        transcript.append(
+            {"text": text, "start": round(start, 2), "duration": duration}
+        )
+        start += duration
+
+    step = start / num_chapters
+    offsets = [int(i * step) for i in range(num_chapters)]
+    chapters = [
+        f"{seconds_to_hms(offset)} Chapter {i + 1}" for i, offset in enumerate(offsets)
+    ]
+    meta_data = SimpleNamespace(
+        transcript={"transcript": transcript, "is_auto_generated": True},
+        chapters=chapters,
+    )
+    return meta_data, offsets
+
+
+def legacy_merge(meta_data, offsets):
+    """The string round-trip implementation this module replaced, for comparison."""
+    cleaned = []
+    for segment in meta_data.transcript["transcript"]:
+        segment = f"{segment['start']} - {segment['text']}"
+        segment = re.sub(r"\[.*?\]", "", segment)
+        segment = re.sub(r"\s+|\n", " ", segment).strip()
+        cleaned.append(segment)
+    transcript_data = [
+        (
+            float(t.split("-", maxsplit=1)[0].strip()),
+            t.split("-", maxsplit=1)[1].strip(),
+        )
+        for t in cleaned
+    ]
+    chapters = [[] for _ in offsets]
+    current = 0
+    for transcript_time, transcript_text in transcript_data:
+        while current + 1 < len(offsets) and transcript_time >= offsets[current + 1]:
+            current += 1
+        chapters[current].append(transcript_text)
+    return chapters
+
+
+def legacy_parse_chapters(chapters):
+    """The previous parser: four uncompiled matches per line, M:SS only."""
+    pattern = r"(\d{1,2}:\d{1,2})\s*[-]?\s*(.*)"
+    for chapter in chapters:
+        re.match(pattern, chapter).groups()
+    return [
+        (
+            re.match(pattern, chapter).groups()[0],
+            re.match(pattern, chapter).groups()[1],
+            re.match(pattern, chapter).groups()[0],
+        )
+        for chapter in chapters
+    ]
+
+
+def check_assignment(meta_data, offsets):
+    # The legacy path keeps segments left empty by cleaning; the new one drops them
+    expected = [
+        [text for text in chapter if text]
+        for chapter in legacy_merge(meta_data, offsets)
+    ]
+    actual = [c.transcript for c in merge_chapter_transcript(meta_data)]
+    if actual != expected:
+        raise AssertionError(
+            "chapter contents differ in chapters "
+            f"{[i for i, (a, e) in enumerate(zip(actual, expected)) if a != e]}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--chapters", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'segments':>10} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8}")
+    for num_segments in args.segments:
+        meta_data, offsets = make_meta_data(num_segments, args.chapters)
+        check_assignment(meta_data, offsets)
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_merge(meta_data, offsets), number=1, repeat=args.repeat
+            )
+        )
+        columnar = min(
+            timeit.repeat(
+                lambda: merge_chapter_transcript(meta_data),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{num_segments:>10} {legacy * 1000:>10.1f} {columnar * 1000:>12.1f} "
+            f"{legacy / columnar:>7.1f}x"
+        )
+
+    # Chapter parsing on its own, with the lines in reverse and duplicated
+    meta_data, _ = make_meta_data(args.segments[-1], args.chapters)
+    chapters = meta_data.chapters[::-1] * 2
+    legacy = min(
+        timeit.repeat(
+            lambda: legacy_parse_chapters(chapters), number=100, repeat=args.repeat
+        )
+    )
+    parsed = min(
+        timeit.repeat(
+            lambda: ChapterTranscript.parse_chapters(chapters),
+            number=100,
+            repeat=args.repeat,
+        )
+    )
+    print(
+        f"parse_chapters ({len(chapters)} lines): legacy {legacy * 10:.3f} ms, "
+        f"compiled {parsed * 10:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
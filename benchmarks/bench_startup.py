@@ -0,0 +1,168 @@
+"""Startup benchmark: API import cost and time until the port accepts requests.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --max-import 1.0 --max-bind 3.0
+    python -m benchmarks.bench_startup --output startup.json
+
+Each measurement runs in a fresh interpreter. The run fails (exit 1) if any
+module in HEAVY_IMPORTS is loaded by `import api.app`, or if import or bind
+time exceeds its threshold, so it doubles as a startup regression check.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+
+# Modules the API must not import before the port binds
+HEAVY_IMPORTS = (
+    "langchain",
+    "langchain_community",
+    "replicate",
+    "googleapiclient",
+    "youtube_transcript_api",
+    "bs4",
+    "IPython",
+    "faiss",
+    "torch",
+    "sentence_transformers",
+    "transformers",
+)
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import api.app
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_import() -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+    ).stdout
+    probe = json.loads(output.strip().splitlines()[-1])
+    loaded = set(probe["modules"])
+    return {
+        "seconds": probe["seconds"],
+        "heavy_modules": [name for name in HEAVY_IMPORTS if name in loaded],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def poll(url: str, deadline: float) -> Optional[int]:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            time.sleep(0.02)
+    return None
+
+
+def measure_server(timeout: float) -> Dict:
+    """Seconds from process start until /health/live and /health/ready answer."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "YOUTUBE_API_TOKEN": os.getenv("YOUTUBE_API_TOKEN", "benchmark"),
+        "ENVIRONMENT": "local",
+    }
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = start + timeout
+        bind = None
+        if poll(f"{base_url}/health/live", deadline) == 200:
+            bind = time.perf_counter() - start
+
+        ready = None
+        while bind is not None and time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"{base_url}/health/ready") as response:
+                    ready = time.perf_counter() - start
+                    break
+            except urllib.error.HTTPError as e:
+                # Startup can fail offline, e.g. when the model cannot download
+                if json.load(e)["status"] == "failed":
+                    break
+            time.sleep(0.05)
+        return {"bind_seconds": bind, "ready_seconds": ready}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def best(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(min(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--max-import", type=float, default=1.0, help="Seconds")
+    parser.add_argument("--max-bind", type=float, default=3.0, help="Seconds")
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.repeat)]
+    servers = [measure_server(args.timeout) for _ in range(args.repeat)]
+    result = {
+        "benchmark": "startup",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "import_seconds": best([probe["seconds"] for probe in imports]),
+        "heavy_modules": imports[0]["heavy_modules"],
+        "bind_seconds": best([server["bind_seconds"] for server in servers]),
+        "ready_seconds": best([server["ready_seconds"] for server in servers]),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result["heavy_modules"]:
+        failures.append(f"api.app imports {', '.join(result['heavy_modules'])}")
+    if result["import_seconds"] > args.max_import:
+        failures.append(f"import took {result['import_seconds']}s > {args.max_import}s")
+    if result["bind_seconds"] is None or result["bind_seconds"] > args.max_bind:
+        failures.append(
+            f"port bound after {result['bind_seconds']}s > {args.max_bind}s"
+        )
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
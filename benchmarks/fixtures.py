@@ -0,0 +1,200 @@
+"""Transcript and metadata fixtures for offline benchmarks.
+
+Synthetic profiles are generated deterministically, from a five-minute clip
+to a four-hour stream, with and without chapters. Real videos can be
+recorded once with API keys set and are picked up from benchmarks/recorded/.
+The repository ships no recordings, since they need network access and
+contain third-party transcripts; record the standard short, long and
+chaptered set (checked for those shapes) before comparing against real data:
+
+    python -m benchmarks.fixtures record-set --short <url> --long <url> \
+        --chaptered <url>
+    python -m benchmarks.fixtures record <youtube_url> --name interview
+    python -m benchmarks.fixtures list
+"""
+
+import json
+import random
+import argparse
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.helpers import seconds_to_hms
+
+
+RECORDED_DIR = Path(__file__).parent / "recorded"
+
+VOCABULARY = (
+    "market rates inflation earnings outlook growth policy bank central "
+    "model training data network layer attention token context window "
+    "team player season coach game score defense offense trade draft "
+    "recipe flour butter oven bake minutes salt sugar dough heat "
+    "history empire war treaty king revolution century trade route city "
+    "so basically you know I think we actually really just like right "
+    "the a an and of to in on for with that this it is was are be have"
+).split()
+
+
+@dataclass
+class Fixture:
+    name: str
+    snippet: Dict
+    transcript: List[Dict]
+    is_auto_generated: bool = True
+
+    @property
+    def duration(self) -> float:
+        last = self.transcript[-1]
+        return last["start"] + last["duration"]
+
+    @property
+    def num_chapters(self) -> int:
+        from data.get_youtube_data import YouTubeDataFetcher
+
+        return len(YouTubeDataFetcher.extract_chapters(self.snippet["description"]))
+
+
+# name: (minutes, chapters)
+PROFILES = {
+    "short": (5, 0),
+    "medium": (30, 8),
+    "long": (120, 24),
+    "multi_hour": (240, 0),
+}
+
+
+# name: (requirement, check) for the recordings benchmarks should be run against
+RECORDED_SET = {
+    "recorded_short": ("under 15 minutes", lambda f: f.duration < 15 * 60),
+    "recorded_long": ("an hour or longer", lambda f: f.duration >= 60 * 60),
+    "recorded_chaptered": ("chapters in its description", lambda f: f.num_chapters),
+}
+
+
+def synthetic_fixture(
+    name: str, minutes: int, num_chapters: int, seed: int = 0
+) -> Fixture:
+    rng = random.Random(f"{name}-{seed}")
+    transcript = []
+    start = 0.0
+    while start < minutes * 60:
+        duration = round(rng.uniform(2.0, 5.0), 2)
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 14)))
+        if rng.random() < 0.03:
+            text = "[Music] " + text
+        transcript.append(
+            {"text": text, "start": round(start, 2), "duration": duration}
+        )
+        start += duration
+
+    description = f"Synthetic {minutes} minute video for benchmarks."
+    if num_chapters:
+        step = start / num_chapters
+        chapters = [
+            f"{seconds_to_hms(int(i * step))} Part {i + 1}: {rng.choice(VOCABULARY)}"
+            for i in range(num_chapters)
+        ]
+        description += "\n\n" + "\n".join(chapters)
+
+    snippet = {
+        "title": f"Benchmark video ({name})",
+        "channelTitle": "Benchmark Channel",
+        "publishedAt": "2024-01-01T00:00:00Z",
+        "description": description,
+    }
+    return Fixture(name, snippet, transcript)
+
+
+def load_fixtures() -> Dict[str, Fixture]:
+    """Synthetic profiles plus every recording in benchmarks/recorded/."""
+    fixtures = {
+        name: synthetic_fixture(name, minutes, chapters)
+        for name, (minutes, chapters) in PROFILES.items()
+    }
+    for path in sorted(RECORDED_DIR.glob("*.json")):
+        with open(path) as f:
+            fixtures[path.stem] = Fixture(**json.load(f))
+    return fixtures
+
+
+def record(youtube_url: str, name: str) -> Fixture:
+    """Capture a real video's snippet and transcript as a fixture."""
+    from data.get_youtube_data import YouTubeDataFetcher
+
+    youtube = YouTubeDataFetcher()
+    video_id = youtube.extract_video_id(youtube_url)
+    snippet = youtube.get_video_snippets([video_id])[video_id]
+    transcript = youtube.get_transcript(video_id)
+    fixture = Fixture(
+        name=name,
+        snippet={
+            key: snippet[key]
+            for key in ("title", "channelTitle", "publishedAt", "description")
+        },
+        transcript=[dict(segment) for segment in transcript["transcript"]],
+        is_auto_generated=transcript["is_auto_generated"],
+    )
+    RECORDED_DIR.mkdir(exist_ok=True)
+    path = RECORDED_DIR / f"{name}.json"
+    with open(path, "w") as f:
+        json.dump(asdict(fixture), f)
+    print(f"Recorded {len(fixture.transcript)} segments to {path}")
+    return fixture
+
+
+def record_set(urls: Dict[str, str]):
+    """Record the standard set, warning when a video lacks its expected shape."""
+    for name, youtube_url in urls.items():
+        requirement, check = RECORDED_SET[name]
+        if not check(record(youtube_url, name)):
+            print(f"WARNING {name} should be {requirement}; record another video")
+
+
+def missing_recordings(fixtures: Dict[str, Fixture]) -> Dict[str, Optional[str]]:
+    """Standard recordings that are absent (None) or lack their expected shape."""
+    missing = {}
+    for name, (requirement, check) in RECORDED_SET.items():
+        if name not in fixtures:
+            missing[name] = None
+        elif not check(fixtures[name]):
+            missing[name] = requirement
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Record a real video")
+    record_parser.add_argument("youtube_url")
+    record_parser.add_argument("--name", required=True)
+    set_parser = subparsers.add_parser(
+        "record-set", help="Record the standard short, long and chaptered videos"
+    )
+    for name in RECORDED_SET:
+        option = name.removeprefix("recorded_")
+        set_parser.add_argument(f"--{option}", required=True, dest=name, metavar="URL")
+    subparsers.add_parser("list", help="List available fixtures")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.youtube_url, args.name)
+    elif args.command == "record-set":
+        record_set({name: getattr(args, name) for name in RECORDED_SET})
+    else:
+        fixtures = load_fixtures()
+        for name, fixture in fixtures.items():
+            source = "synthetic" if name in PROFILES else "recorded"
+            print(
+                f"{name:>18}: {source:>9}, {len(fixture.transcript):>6} segments, "
+                f"{fixture.duration / 60:>6.1f} min, {fixture.num_chapters:>3} chapters"
+            )
+        for name, requirement in missing_recordings(fixtures).items():
+            if requirement is None:
+                print(f"{name:>18}: not recorded (see record-set)")
+            else:
+                print(f"{name:>18}: should be {requirement}")
+
+
+if __name__ == "__main__":
+    main()
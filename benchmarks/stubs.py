@@ -0,0 +1,200 @@
+"""Local stand-ins for the YouTube Data API, YouTubeTranscriptApi and Replicate.
+
+Each stub sleeps for a configurable latency so benchmarks exercise the same
+concurrency as production without network calls, quota or cost.
+"""
+
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.fixtures import Fixture
+
+
+@dataclass
+class Latency:
+    youtube: float = 0.1
+    transcript: float = 0.3
+    # Replicate: time to first token, then per generated token
+    llm_first_token: float = 0.5
+    llm_per_token: float = 0.005
+    llm_output_tokens: int = 200
+    # Per embedded text, for the hashing embeddings
+    embedding: float = 0.001
+
+
+class FixtureCatalog:
+    """Maps benchmark video IDs to fixtures.
+
+    IDs are 11 characters like real ones: "v" plus a two-digit fixture index,
+    then a request number, so cold runs can use a fresh ID per request.
+    """
+
+    def __init__(self, fixtures: Dict[str, Fixture]):
+        self.names = list(fixtures)
+        self.fixtures = fixtures
+
+    def video_id(self, name: str, n: int = 0) -> str:
+        return f"v{self.names.index(name):02d}{n:08d}"
+
+    def get(self, video_id: str) -> Optional[Fixture]:
+        index = int(video_id[1:3])
+        return self.fixtures[self.names[index]] if index < len(self.names) else None
+
+
+class _Http:
+    def request(self, *args, **kwargs):
+        return None
+
+
+class _Request:
+    def __init__(self, response: Dict, latency: float):
+        self.response = response
+        self.latency = latency
+        self.http = _Http()
+
+    def execute(self, http=None, num_retries: int = 0):
+        # Go through `http` like HttpRequest, so quota is charged per attempt
+        (http or self.http).request()
+        time.sleep(self.latency)
+        return self.response
+
+
+class _Videos:
+    def __init__(self, catalog: FixtureCatalog, latency: Latency):
+        self.catalog = catalog
+        self.latency = latency
+
+    def list(self, part: str, id: str, **kwargs) -> _Request:
+        items = []
+        for video_id in id.split(","):
+            fixture = self.catalog.get(video_id)
+            if fixture is not None:
+                items.append({"id": video_id, "snippet": fixture.snippet})
+        return _Request({"items": items}, self.latency.youtube)
+
+
+class StubYouTubeClient:
+    """Replaces the googleapiclient resource returned by `build`."""
+
+    def __init__(self, catalog: FixtureCatalog, latency: Latency):
+        self._videos = _Videos(catalog, latency)
+
+    def videos(self) -> _Videos:
+        return self._videos
+
+
+class _Transcript:
+    language = "English"
+    language_code = "en"
+    is_translatable = False
+
+    def __init__(self, fixture: Fixture):
+        self.fixture = fixture
+        self.is_generated = fixture.is_auto_generated
+
+    def fetch(self) -> List[Dict]:
+        return [dict(segment) for segment in self.fixture.transcript]
+
+
+class _TranscriptList:
+    def __init__(self, fixture: Fixture):
+        self.transcripts = [_Transcript(fixture)]
+
+    def __iter__(self):
+        return iter(self.transcripts)
+
+    def find_transcript(self, language_codes: List[str]) -> _Transcript:
+        return self.transcripts[0]
+
+
+class StubTranscriptApi:
+    """Replaces `YouTubeTranscriptApi`."""
+
+    def __init__(self, catalog: FixtureCatalog, latency: Latency):
+        self.catalog = catalog
+        self.latency = latency
+
+    def list_transcripts(self, video_id: str, proxies=None) -> _TranscriptList:
+        time.sleep(self.latency.transcript)
+        fixture = self.catalog.get(video_id)
+        if fixture is None:
+            raise ValueError(f"No transcript for {video_id}")
+        return _TranscriptList(fixture)
+
+
+def _fake_tokens(prompt: str, count: int) -> List[str]:
+    words = prompt.split()[-count:] or ["summary"]
+    return [f"{words[i % len(words)]} " for i in range(count)]
+
+
+class StubReplicateClient:
+    """Replaces `replicate.Client`, generating text after a simulated delay."""
+
+    latency = Latency()
+
+    def __init__(self, api_token: Optional[str] = None, **kwargs):
+        pass
+
+    def _output_tokens(self, input: Dict[str, Any]) -> int:
+        return min(self.latency.llm_output_tokens, input.get("max_tokens", 2000))
+
+    def run(self, model: str, input: Dict[str, Any]) -> List[str]:
+        count = self._output_tokens(input)
+        time.sleep(self.latency.llm_first_token + count * self.latency.llm_per_token)
+        return _fake_tokens(input["prompt"], count)
+
+    def stream(self, model: str, input: Dict[str, Any]) -> Iterator[str]:
+        time.sleep(self.latency.llm_first_token)
+        for token in _fake_tokens(input["prompt"], self._output_tokens(input)):
+            time.sleep(self.latency.llm_per_token)
+            yield token
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic embeddings from text hashes, with a per-text delay."""
+
+    model_name = "benchmark-hash"
+
+    def __init__(self, dimension: int = 768, latency: Optional[Latency] = None):
+        self.dimension = dimension
+        self.latency = latency or Latency()
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(len(texts) * self.latency.embedding)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def warm_up(self):
+        pass
+
+
+def install(
+    catalog: FixtureCatalog, latency: Latency, embeddings: Optional[Embeddings] = None
+):
+    """Patch the app's external clients with stubs. Call before the app starts."""
+    import api.replicate_api
+    import data.get_youtube_data
+    import src.embeddings
+
+    data.get_youtube_data.build = lambda *args, **kwargs: StubYouTubeClient(
+        catalog, latency
+    )
+    data.get_youtube_data.YouTubeTranscriptApi = StubTranscriptApi(catalog, latency)
+    StubReplicateClient.latency = latency
+    # The /qa chain's LLM goes through the same shared client
+    api.replicate_api.replicate.Client = StubReplicateClient
+    api.replicate_api.close_replicate_client()
+    if embeddings is not None:
+        src.embeddings.get_embedding_engine = lambda: embeddings
@@ -1,6 +1,8 @@
 import re
 import os
 import logging
+import threading
+from collections import Counter
 from typing import Dict, List, Optional, TypedDict, Union
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -9,10 +11,30 @@ from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api._errors import (
+    InvalidVideoId,
+    NoTranscriptAvailable,
+    NoTranscriptFound,
+    TooManyRequests,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    YouTubeRequestFailed,
+)
+import httplib2
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
 
 
 from utils.helpers import timestamp_to_date
+from utils.cache import Cache, get_cache
+from data.metadata_batcher import MetadataBatcher
+from data.proxy_pool import PROXY_ERRORS, ProxyPool
+from utils.metrics import (
+    TRANSCRIPT_CHARS,
+    TRANSCRIPT_SEGMENTS,
+    YOUTUBE_QUOTA_UNITS,
+    timed,
+)
 
 
 logging.basicConfig(
@@ -21,6 +43,40 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+_thread_local = threading.local()
+
+YOUTUBE_TIMEOUT = float(os.getenv("YOUTUBE_TIMEOUT", 10))
+# googleapiclient retries 429, 5xx and connection errors with jittered backoff
+YOUTUBE_NUM_RETRIES = int(os.getenv("YOUTUBE_NUM_RETRIES", 3))
+
+
+def _build_request(http, *args, **kwargs):
+    # httplib2.Http is not thread-safe; give each worker thread its own
+    # keep-alive connection so the shared discovery client can be used from a pool
+    if not hasattr(_thread_local, "http"):
+        _thread_local.http = httplib2.Http(timeout=YOUTUBE_TIMEOUT)
+    return HttpRequest(_thread_local.http, *args, **kwargs)
+
+
+class _QuotaHttp:
+    """Wraps an httplib2.Http to call `charge` before every attempt.
+
+    googleapiclient retries through `http.request`, and the Data API charges
+    quota for failed requests too, so each retry costs units.
+    """
+
+    def __init__(self, http, charge):
+        self._http = http
+        self._charge = charge
+
+    def request(self, *args, **kwargs):
+        self._charge()
+        return self._http.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+
 @dataclass
 class Transcript:
     transcript: List[Dict[str, Union[str, float]]]
@@ -42,16 +98,46 @@ class MetaData:
     publish_date: str
     chapters: str
     transcript: Optional[Transcript]
+    video_id: Optional[str] = None
 
 
 class YouTubeDataFetcher:
     YOUTUBE_API_VERSION = "v3"
     TRANSCRIPT_LANG_CODE = "en"
-
-    def __init__(self, env_path: Optional[Path] = None):
+    MAX_IDS_PER_REQUEST = 50
+    # Data API quota units per request, see
+    # developers.google.com/youtube/v3/determine_quota_cost
+    QUOTA_COST = {"videos.list": 1, "playlistItems.list": 1}
+    # Transcript API errors that mean YouTube blocked or dropped the proxy's IP,
+    # so another proxy may succeed; others (no transcript, private video) won't
+    TRANSCRIPT_PROXY_ERRORS = PROXY_ERRORS + (TooManyRequests, YouTubeRequestFailed)
+
+    def __init__(
+        self,
+        env_path: Optional[Path] = None,
+        cache: Optional[Cache] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+    ):
         self.api_key = self._load_api_key(env_path)
         self.youtube_client = build(
-            "youtube", self.YOUTUBE_API_VERSION, developerKey=self.api_key
+            "youtube",
+            self.YOUTUBE_API_VERSION,
+            developerKey=self.api_key,
+            requestBuilder=_build_request,
+        )
+        self.cache = cache if cache is not None else get_cache("youtube")
+        self.proxy_pool = (
+            proxy_pool
+            if proxy_pool is not None
+            else ProxyPool.from_env(proxy_errors=self.TRANSCRIPT_PROXY_ERRORS)
+        )
+        self.quota_used: Counter = Counter()
+        self._quota_lock = threading.Lock()
+        # Concurrent single-video lookups share one videos().list call
+        self.metadata_batcher = MetadataBatcher(
+            self.get_video_snippets,
+            window=float(os.getenv("YOUTUBE_BATCH_WINDOW", 0.02)),
+            max_batch=self.MAX_IDS_PER_REQUEST,
         )
 
     @staticmethod
@@ -62,27 +148,19 @@ class YouTubeDataFetcher:
             raise ValueError("YOUTUBE_API_TOKEN is not set in the environment.")
         return api_key
 
+    @timed("get_transcript")
     def get_transcript(self, video_id: str) -> Optional[Transcript]:
         transcript = None
         try:
-            environment = os.getenv("ENVIRONMENT", "local")
-            print(f"Running in environment: {environment}")
-            if environment == "local":
+            if self.proxy_pool is None:
                 transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
             else:
-                proxy_list = os.getenv("PROXY_LIST")
-                for proxy_string in proxy_list.split(","):
-                    ip_port, username, password = proxy_string.rsplit(":", 2)
-                    proxy_url = f"socks5://{username}:{password}@{ip_port}"
-                    proxies = {"http": proxy_url, "https": proxy_url}
-                    try:
-                        transcript_list = YouTubeTranscriptApi.list_transcripts(
-                            video_id, proxies=proxies
-                        )
-                        break
-                    except Exception as e:
-                        logger.error("Proxy failed")
-                        continue
+                # The returned transcripts keep using the proxy that won
+                transcript_list = self.proxy_pool.run(
+                    lambda proxies: YouTubeTranscriptApi.list_transcripts(
+                        video_id, proxies=proxies
+                    )
+                )
 
             for transcript in transcript_list:
                 logger.info(f"Language: {transcript.language}")
@@ -104,6 +182,14 @@ class YouTubeDataFetcher:
                 [self.TRANSCRIPT_LANG_CODE]
             )
             return {"transcript": auto_transcript.fetch(), "is_auto_generated": True}
+        except (
+            InvalidVideoId,
+            NoTranscriptAvailable,
+            NoTranscriptFound,
+            TranscriptsDisabled,
+            VideoUnavailable,
+        ) as e:
+            raise TranscriptUnavailableError(f"No transcript available: {e}")
         except Exception as e:
             raise TranscriptError(f"Failed to fetch transcript: {e}")
 
@@ -128,31 +214,103 @@ class YouTubeDataFetcher:
         match = re.search(pattern, url)
         return match.group(1) if match else None
 
+    def _execute(self, method: str, request):
+        cost = self.QUOTA_COST[method]
+
+        def charge():
+            YOUTUBE_QUOTA_UNITS.labels(method).inc(cost)
+            with self._quota_lock:
+                self.quota_used[method] += cost
+
+        return request.execute(
+            http=_QuotaHttp(request.http, charge), num_retries=YOUTUBE_NUM_RETRIES
+        )
+
+    def quota_stats(self) -> Dict[str, int]:
+        """Units spent by this process; /metrics aggregates every worker."""
+        with self._quota_lock:
+            return {"total": sum(self.quota_used.values()), **self.quota_used}
+
+    def cache_key(self, video_id: str) -> str:
+        return f"{video_id}:{self.TRANSCRIPT_LANG_CODE}"
+
+    def get_cached_meta_data(self, video_id: str) -> Optional[MetaData]:
+        return self.cache.get(self.cache_key(video_id))
+
+    def get_video_snippets(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch snippets for many videos, up to 50 IDs per videos().list call."""
+        snippets = {}
+        for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST):
+            batch = video_ids[i : i + self.MAX_IDS_PER_REQUEST]
+            response = self._execute(
+                "videos.list",
+                # maxResults only applies to myRating/chart queries, not id=
+                self.youtube_client.videos().list(part="snippet", id=",".join(batch)),
+            )
+            for item in response.get("items", []):
+                snippets[item["id"]] = item["snippet"]
+        return snippets
+
+    def get_playlist_video_ids(self, playlist_id: str) -> List[str]:
+        video_ids = []
+        page_token = None
+        while True:
+            response = self._execute(
+                "playlistItems.list",
+                self.youtube_client.playlistItems().list(
+                    part="contentDetails",
+                    playlistId=playlist_id,
+                    maxResults=self.MAX_IDS_PER_REQUEST,
+                    pageToken=page_token,
+                ),
+            )
+            video_ids.extend(
+                item["contentDetails"]["videoId"] for item in response.get("items", [])
+            )
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return video_ids
+
+    def build_meta_data(self, video_id: str, snippet: Dict) -> MetaData:
+        """Fetch the transcript for an already-fetched snippet and cache the result."""
+        transcript = self.get_transcript(video_id)
+        segments = transcript["transcript"]
+        TRANSCRIPT_SEGMENTS.observe(len(segments))
+        TRANSCRIPT_CHARS.observe(sum(len(segment["text"]) for segment in segments))
+        chapters = self.extract_chapters(snippet["description"])
+
+        meta_data = MetaData(
+            title=snippet["title"],
+            channel_name=snippet["channelTitle"],
+            publish_date=timestamp_to_date(snippet["publishedAt"]),
+            chapters=chapters,
+            transcript=transcript,
+            video_id=video_id,
+        )
+        self.cache.set(self.cache_key(video_id), meta_data)
+        return meta_data
+
+    @timed("get_meta_data")
     def get_meta_data(self, video_url: str) -> MetaData:
         video_id = self.extract_video_id(video_url)
         if not video_id:
             raise ValueError(f"Could not extract valid video ID from URL: {video_url}")
 
-        try:
-            response = (
-                self.youtube_client.videos().list(part="snippet", id=video_id).execute()
-            )
-
-            if not response.get("items"):
-                raise YouTubeAPIError(f"No video found for ID: {video_id}")
+        meta_data = self.get_cached_meta_data(video_id)
+        if meta_data is not None:
+            logger.info(f"Cache hit for video {video_id}")
+            return meta_data
 
-            meta = response["items"][0]["snippet"]
-            transcript = self.get_transcript(video_id)
-            chapters = self.extract_chapters(meta["description"])
+        try:
+            snippet = self.metadata_batcher.get(video_id)
+            if snippet is None:
+                raise VideoNotFoundError(f"No video found for ID: {video_id}")
 
-            return MetaData(
-                title=meta["title"],
-                channel_name=meta["channelTitle"],
-                publish_date=timestamp_to_date(meta["publishedAt"]),
-                chapters=chapters,
-                transcript=transcript,
-            )
+            return self.build_meta_data(video_id, snippet)
 
+        except ValueError:
+            # Permanent failures keep their type so callers do not retry them
+            raise
         except Exception as e:
             raise YouTubeAPIError(f"Failed to fetch video metadata: {str(e)}")
 
@@ -163,3 +321,11 @@ class YouTubeAPIError(Exception):
 
 class TranscriptError(Exception):
     pass
+
+
+class VideoNotFoundError(YouTubeAPIError, ValueError):
+    """The video does not exist or is private; retrying cannot help."""
+
+
+class TranscriptUnavailableError(TranscriptError, ValueError):
+    """The video has no usable transcript; retrying cannot help."""
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+class MetadataBatcher:
+    """Coalesce concurrent single-video snippet lookups into 50-ID requests.
+
+    Callers block on `get` while IDs gather for up to `window` seconds (or until
+    `max_batch` are pending); one videos().list call then answers all of them.
+    """
+
+    def __init__(
+        self,
+        fetch_batch: Callable[[List[str]], Dict[str, Dict]],
+        window: float = 0.02,
+        max_batch: int = 50,
+    ):
+        self.fetch_batch = fetch_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        """Return the snippet for `video_id`, or None if the video does not exist."""
+        return self.submit(video_id).result()
+
+    def submit(self, video_id: str) -> Future:
+        flush_now = False
+        with self._lock:
+            future = self._pending.get(video_id)
+            if future is not None:
+                return future
+
+            future = Future()
+            self._pending[video_id] = future
+            if len(self._pending) >= self.max_batch:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+        return future
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+
+        video_ids = list(pending)
+        for i in range(0, len(video_ids), self.max_batch):
+            batch = video_ids[i : i + self.max_batch]
+            try:
+                snippets = self.fetch_batch(batch)
+            except Exception as e:
+                for video_id in batch:
+                    pending[video_id].set_exception(e)
+                continue
+            for video_id in batch:
+                pending[video_id].set_result(snippets.get(video_id))
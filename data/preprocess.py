@@ -1,24 +1,56 @@
 import re
+from bisect import bisect_left
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Union
 
 from utils.helpers import time_to_seconds
+from utils.metrics import timed
 
 
-def clean_transcript(transcript: list[dict[str, str]]) -> list[str]:
-    cleaned = []
-    for segment in transcript:
-        segment = f"{segment['start']} - {segment['text']}"
-        segment = clean_text(segment)
-        cleaned.append(segment)
-    return cleaned
+ANNOTATION_PATTERN = re.compile(r"\[.*?\]")  # Annotations such as [Music]
+CHAPTER_PATTERN = re.compile(r"\s*(\d{1,2}(?::\d{2}){1,2})\s*[-–—]?\s*(.*)")
 
 
 def clean_text(text):
-    text = re.sub(r"\[.*?\]", "", text)  # Remove annotations [Music]
-    text = re.sub(r"\s+|\n", " ", text).strip()  # White space or newline
-    return text
+    if "[" in text:
+        text = ANNOTATION_PATTERN.sub("", text)
+    # Collapse white space and newlines
+    return " ".join(text.split())
+
+
+@dataclass
+class TranscriptColumns:
+    """Transcript segments as parallel arrays of start, duration and cleaned text."""
+
+    start: List[float] = field(default_factory=list)
+    duration: List[float] = field(default_factory=list)
+    text: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_segments(
+        cls, transcript: List[Dict[str, Union[str, float]]]
+    ) -> "TranscriptColumns":
+        """Clean every segment in one pass, dropping ones left empty."""
+        columns = cls()
+        for segment in transcript:
+            text = clean_text(segment["text"])
+            if not text:
+                continue
+            columns.start.append(float(segment["start"]))
+            columns.duration.append(float(segment.get("duration", 0.0)))
+            columns.text.append(text)
+        return columns
+
+    @property
+    def end(self) -> List[float]:
+        return [start + duration for start, duration in zip(self.start, self.duration)]
+
+    def __len__(self):
+        return len(self.text)
+
+
+def clean_transcript(transcript: list[dict[str, str]]) -> list[str]:
+    return TranscriptColumns.from_segments(transcript).text
 
 
 @dataclass
@@ -26,56 +58,56 @@ class ChapterTranscript:
     chapter: str
     timestamp: str
     transcript: List[str] = field(default_factory=list)
+    # Start and end seconds of each transcript line, when known
+    start: List[float] = field(default_factory=list)
+    end: List[float] = field(default_factory=list)
 
     @staticmethod
     def parse_chapters(chapters: List[str]) -> List[Tuple[int, "ChapterTranscript"]]:
-        pattern = r"(\d{1,2}:\d{1,2})\s*[-]?\s*(.*)"
-        output = []
+        """Parse "M:SS Title" / "H:MM:SS Title" lines into (seconds, chapter) pairs.
+
+        Each line is matched once. The result is sorted by start time with
+        duplicate start times dropped, ready for binary-search assignment.
+        """
+        parsed = {}
         try:
             for chapter in chapters:
-                timestamp, text = re.match(pattern, chapter).groups()
-                output.append(
-                    (
-                        time_to_seconds(timestamp),
-                        ChapterTranscript(
-                            chapter=text,
-                            timestamp=timestamp,
-                        ),
-                    )
-                )
-            return [
-                (
-                    time_to_seconds(re.match(pattern, chapter).groups()[0]),
-                    ChapterTranscript(
-                        chapter=re.match(pattern, chapter).groups()[1],
-                        timestamp=re.match(pattern, chapter).groups()[0],
-                    ),
+                timestamp, text = CHAPTER_PATTERN.match(chapter).groups()
+                # Keep the first title listed for a given start time
+                parsed.setdefault(
+                    time_to_seconds(timestamp),
+                    ChapterTranscript(chapter=text.strip(), timestamp=timestamp),
                 )
-                for chapter in chapters
-            ]
         except Exception as e:
             raise ValueError(f"Failed to parse chapters: {e}")
+        return sorted(parsed.items(), key=lambda item: item[0])
 
     @staticmethod
     def assign_transcripts_to_chapters(
         chapter_data: List[Tuple[int, "ChapterTranscript"]],
-        transcript_data: List[Tuple[float, str]],
+        transcript_data: TranscriptColumns,
     ) -> List["ChapterTranscript"]:
-        """Assign transcript entries to the appropriate chapters."""
+        """Assign transcript entries to the appropriate chapters.
+
+        Segment start times are ascending, so each chapter's segments are the
+        slice between binary-searched chapter start offsets. Segments before
+        the first chapter belong to it.
+        """
         try:
-            current_chapter_index = 0
-            for transcript_time, transcript_text in transcript_data:
-                # Move to the next chapter if the transcript time exceeds the current chapter time
-                while (
-                    current_chapter_index + 1 < len(chapter_data)
-                    and transcript_time >= chapter_data[current_chapter_index + 1][0]
-                ):
-                    current_chapter_index += 1
-
-                # Add the transcript to the current chapter
-                chapter_data[current_chapter_index][1].transcript.append(
-                    transcript_text
+            boundaries = [0]
+            for offset, _ in chapter_data[1:]:
+                boundaries.append(bisect_left(transcript_data.start, offset))
+            boundaries.append(len(transcript_data))
+            end = transcript_data.end
+
+            for i, (_, chapter) in enumerate(chapter_data):
+                chapter.transcript.extend(
+                    transcript_data.text[boundaries[i] : boundaries[i + 1]]
                 )
+                chapter.start.extend(
+                    transcript_data.start[boundaries[i] : boundaries[i + 1]]
+                )
+                chapter.end.extend(end[boundaries[i] : boundaries[i + 1]])
 
             # Return only the ChapterTranscript objects
             return [chapter for _, chapter in chapter_data]
@@ -83,30 +115,27 @@ class ChapterTranscript:
             raise ValueError(f"Failed to assign transcripts to chapters: {e}")
 
 
+@timed("merge_chapter_transcript")
 def merge_chapter_transcript(meta_data):
-    transcript = meta_data.transcript["transcript"]
-    cleaned = clean_transcript(transcript)
+    columns = TranscriptColumns.from_segments(meta_data.transcript["transcript"])
 
     chapters = meta_data.chapters
 
     if not chapters:
-        transcript_data = [t.split("-", maxsplit=1)[1].strip() for t in cleaned]
         return [
-            ChapterTranscript(chapter=None, timestamp=None, transcript=transcript_data)
+            ChapterTranscript(
+                chapter=None,
+                timestamp=None,
+                transcript=columns.text,
+                start=columns.start,
+                end=columns.end,
+            )
         ]
 
-    transcript_data = [
-        (
-            float(t.split("-", maxsplit=1)[0].strip()),
-            t.split("-", maxsplit=1)[1].strip(),
-        )
-        for t in cleaned
-    ]
-
     chapter_data = ChapterTranscript.parse_chapters(chapters)
     # Assign transcripts to chapters
     merged_chapters = ChapterTranscript.assign_transcripts_to_chapters(
-        chapter_data, transcript_data
+        chapter_data, columns
     )
     return merged_chapters
 
@@ -199,6 +228,73 @@ Inputs:"""
     return "\n".join(prompt)
 
 
+def get_section_prompt(meta_data, section):
+    prompt = [
+        """
+Instructions:
+* The transcript below is one section of a longer video.
+* Summarize this section in **bullet-point format**.
+* Keep key facts, names and numbers.
+* Do not add a title or an overall summary.
+
+Inputs:"""
+    ]
+    prompt.append(f"Title: {meta_data.title}")
+    prompt.append(f"Channel Name: {meta_data.channel_name}")
+    prompt.append(
+        f"Transcript is auto-generated: {meta_data.transcript['is_auto_generated']}"
+    )
+    prompt.append("")
+
+    if section.timestamp:
+        prompt.append(f"(Timestamp: {section.timestamp}) {section.chapter}")
+    elif section.chapter:
+        prompt.append(section.chapter)
+    prompt.append("Transcript:")
+    prompt.append(" ".join(section.transcript))
+
+    return "\n".join(prompt)
+
+
+def get_reduce_prompt(meta_data, section_summaries):
+    prompt = [
+        """
+Instructions:
+* Provide video title
+* Provide high level overall summary.
+* Below are summaries of consecutive sections of the video.
+* For each section create an informative summary in **bullet-point format**.
+* Include the section's timestamp where given.
+
+Can refer to this example structure:
+```
+Title:
+    High level summary
+Chapter 1: Example Title (00:00 - 02:00)
+    - Summary
+
+Chapter 2: Example Title (02:00 - 04:00)
+    - Summary
+```
+
+Inputs:"""
+    ]
+    prompt.append(f"Title: {meta_data.title}")
+    prompt.append(f"Channel Name: {meta_data.channel_name}")
+    prompt.append("")
+
+    for section in section_summaries:
+        if section.timestamp:
+            prompt.append(f"(Timestamp: {section.timestamp}) {section.chapter}")
+        elif section.chapter:
+            prompt.append(section.chapter)
+        prompt.append("Section summary:")
+        prompt.append(" ".join(section.transcript))
+        prompt.append("")
+
+    return "\n".join(prompt)
+
+
 def get_video_info(meta_data, chapter_transcript):
     prompt = []
     prompt.append(f"Title: {meta_data.title}")
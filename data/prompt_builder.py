@@ -0,0 +1,161 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, List
+
+from data.preprocess import ChapterTranscript
+
+
+logger = logging.getLogger(__name__)
+
+# Llama 3 8B has an 8k context; keep room for the generated summary
+CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", 8192))
+OUTPUT_TOKENS = int(os.getenv("SUMMARY_OUTPUT_TOKENS", 2000))
+MIN_OUTPUT_TOKENS = 256
+
+DISFLUENCY_PATTERN = re.compile(
+    r"\b(?:u+h+|u+m+|e+r+m+|hmm+|mm-hmm|uh-huh)\b[,.]?\s*", re.IGNORECASE
+)
+# Only words that are never repeated on purpose are collapsed, so "had had",
+# "that that", "bye bye" and repeated numbers survive
+STUTTER_WORDS = ("i", "a", "an", "the", "and", "but", "of", "to", "my", "we", "they")
+REPEATED_WORD_PATTERN = re.compile(
+    rf"\b({'|'.join(STUTTER_WORDS)})(?:\s+\1\b)+", re.IGNORECASE
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer() -> Callable[[List[str]], List[List[int]]]:
+    """Load the Llama 3 tokenizer once, falling back to close approximations.
+
+    LLAMA_TOKENIZER points at a local directory or cached hub ID; no download
+    is attempted at request time. tiktoken's cl100k_base shares most of
+    Llama 3's BPE vocabulary and is the first fallback.
+    """
+    name = os.getenv("LLAMA_TOKENIZER", "meta-llama/Meta-Llama-3-8B-Instruct")
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+        logger.info(f"Loaded tokenizer {name}")
+        return lambda texts: tokenizer(texts, add_special_tokens=False)["input_ids"]
+    except Exception as e:
+        logger.warning(f"Llama 3 tokenizer unavailable ({e}), using cl100k_base")
+
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda texts: encoding.encode_ordinary_batch(texts)
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}), estimating tokens from length")
+
+    # Roughly four characters per token for English text
+    return lambda texts: [range(len(text) // 4) for text in texts]
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()([text])[0])
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    if not texts:
+        return []
+    return [len(ids) for ids in get_tokenizer()(texts)]
+
+
+def input_budget() -> int:
+    return CONTEXT_TOKENS - OUTPUT_TOKENS
+
+
+def max_output_tokens(prompt: str, limit: int = OUTPUT_TOKENS) -> int:
+    """Tokens left for generation once `prompt` is in the context window."""
+    return max(MIN_OUTPUT_TOKENS, min(limit, CONTEXT_TOKENS - count_tokens(prompt)))
+
+
+def compress_line(line: str) -> str:
+    line = DISFLUENCY_PATTERN.sub("", line)
+    line = REPEATED_WORD_PATTERN.sub(r"\1", line)
+    return WHITESPACE_PATTERN.sub(" ", line).strip()
+
+
+def compress_transcript(
+    chapter_transcript: List[ChapterTranscript],
+) -> List[ChapterTranscript]:
+    """Drop filler sounds, stuttered function words and repeated caption fragments."""
+    compressed = []
+    for chapter in chapter_transcript:
+        lines = []
+        previous = ""
+        for line in chapter.transcript:
+            line = compress_line(line)
+            if not line or line == previous:
+                continue
+            # Auto-captions often repeat the previous segment before extending it
+            if previous and line.startswith(previous + " "):
+                previous, line = line, line[len(previous) :].strip()
+            else:
+                previous = line
+            lines.append(line)
+        compressed.append(
+            ChapterTranscript(
+                chapter=chapter.chapter, timestamp=chapter.timestamp, transcript=lines
+            )
+        )
+    return compressed
+
+
+def trim_transcript(
+    chapter_transcript: List[ChapterTranscript], max_tokens: int
+) -> List[ChapterTranscript]:
+    """Keep an evenly spaced subset of lines in every chapter to fit `max_tokens`."""
+    line_tokens = [count_tokens_batch(c.transcript) for c in chapter_transcript]
+    total = sum(sum(tokens) for tokens in line_tokens)
+    if total <= max_tokens:
+        return chapter_transcript
+
+    ratio = max_tokens / total
+    trimmed = []
+    for chapter, tokens in zip(chapter_transcript, line_tokens):
+        lines = []
+        kept = 0.0
+        for line, n in zip(chapter.transcript, tokens):
+            kept += n * ratio
+            if kept >= n:
+                lines.append(line)
+                kept -= n
+        trimmed.append(
+            ChapterTranscript(
+                chapter=chapter.chapter, timestamp=chapter.timestamp, transcript=lines
+            )
+        )
+    return trimmed
+
+
+def fit_prompt(
+    meta_data,
+    chapter_transcript: List[ChapterTranscript],
+    build: Callable,
+    max_tokens: int = None,
+) -> str:
+    """Build a prompt with `build`, trimming the transcript until it fits the budget."""
+    max_tokens = max_tokens or input_budget()
+    prompt = build(meta_data, chapter_transcript)
+    prompt_tokens = count_tokens(prompt)
+    if prompt_tokens > max_tokens:
+        transcript_tokens = sum(
+            sum(count_tokens_batch(c.transcript)) for c in chapter_transcript
+        )
+        overhead = prompt_tokens - transcript_tokens
+        chapter_transcript = trim_transcript(
+            chapter_transcript, max(max_tokens - overhead, 0)
+        )
+        prompt = build(meta_data, chapter_transcript)
+        logger.warning(
+            f"Trimmed prompt from {prompt_tokens} to {count_tokens(prompt)} tokens"
+        )
+    else:
+        logger.info(f"Prompt size: {prompt_tokens} tokens")
+    return prompt
@@ -0,0 +1,234 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+import requests
+
+from utils.metrics import PROXY_ATTEMPTS
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Failures of the proxy or the network path through it; anything else is an
+# answer from the upstream (e.g. "no transcript") that no other proxy changes.
+# OSError covers PySocks' proxy errors, socket timeouts and refused connections.
+PROXY_ERRORS: Tuple[Type[BaseException], ...] = (
+    requests.exceptions.RequestException,
+    OSError,
+)
+
+
+@dataclass
+class ProxyState:
+    url: str
+    # Exponentially weighted latency (seconds) and success rate
+    latency: float = 1.0
+    success_rate: float = 1.0
+    consecutive_failures: int = 0
+    opened_at: Optional[float] = None
+
+    @property
+    def proxies(self) -> Dict[str, str]:
+        return {"http": self.url, "https": self.url}
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def score(self) -> float:
+        return self.success_rate / max(self.latency, 0.01)
+
+
+class ProxyPool:
+    """Long-lived pool of SOCKS5 proxies for transcript fetches.
+
+    Proxies are ranked by recent latency and success rate. After
+    `failure_threshold` consecutive failures a proxy's circuit opens and it is
+    skipped until a background probe succeeds through it again. Each call is
+    hedged: if the best proxy has not answered within `hedge_delay`, the next
+    one is raced against it, up to `top_k` in flight. Only `proxy_errors`
+    count against a proxy and move on to the next one; other exceptions are
+    raised to the caller at once.
+    """
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(
+        self,
+        proxy_urls: List[str],
+        top_k: int = 2,
+        hedge_delay: float = 1.0,
+        failure_threshold: int = 3,
+        probe_interval: float = 30.0,
+        probe_url: str = "https://www.youtube.com/robots.txt",
+        probe_timeout: float = 5.0,
+        proxy_errors: Tuple[Type[BaseException], ...] = PROXY_ERRORS,
+    ):
+        if not proxy_urls:
+            raise ValueError("ProxyPool needs at least one proxy")
+        self.states = [ProxyState(url) for url in proxy_urls]
+        self.top_k = top_k
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_url = probe_url
+        self.probe_timeout = probe_timeout
+        self.proxy_errors = proxy_errors
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(4, top_k * 8), thread_name_prefix="proxy"
+        )
+
+    @staticmethod
+    def parse_proxy_list(proxy_list: str) -> List[str]:
+        """Parse "ip:port:username:password,..." into socks5 URLs."""
+        urls = []
+        for proxy_string in proxy_list.split(","):
+            proxy_string = proxy_string.strip()
+            if not proxy_string:
+                continue
+            ip_port, username, password = proxy_string.rsplit(":", 2)
+            urls.append(f"socks5://{username}:{password}@{ip_port}")
+        return urls
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional["ProxyPool"]:
+        """Build and start the pool from PROXY_LIST, or None when running locally."""
+        if os.getenv("ENVIRONMENT", "local") == "local":
+            return None
+        proxy_list = os.getenv("PROXY_LIST")
+        if not proxy_list:
+            raise ValueError("PROXY_LIST is not set in the environment.")
+        pool = cls(
+            cls.parse_proxy_list(proxy_list),
+            top_k=int(os.getenv("PROXY_HEDGE_TOP_K", 2)),
+            hedge_delay=float(os.getenv("PROXY_HEDGE_DELAY", 1.0)),
+            failure_threshold=int(os.getenv("PROXY_FAILURE_THRESHOLD", 3)),
+            probe_interval=float(os.getenv("PROXY_PROBE_INTERVAL", 30)),
+            **kwargs,
+        )
+        pool.start()
+        return pool
+
+    def ranked(self) -> List[ProxyState]:
+        with self._lock:
+            closed = [state for state in self.states if not state.is_open]
+            # With every circuit open, still try the least recently tripped
+            if not closed:
+                closed = sorted(self.states, key=lambda state: state.opened_at)[:1]
+            return sorted(closed, key=lambda state: state.score, reverse=True)
+
+    def record(self, state: ProxyState, ok: bool, latency: float):
+        alpha = self.EWMA_ALPHA
+        with self._lock:
+            state.success_rate = (1 - alpha) * state.success_rate + alpha * ok
+            if ok:
+                state.latency = (1 - alpha) * state.latency + alpha * latency
+                state.consecutive_failures = 0
+                state.opened_at = None
+            else:
+                state.consecutive_failures += 1
+                if (
+                    state.consecutive_failures >= self.failure_threshold
+                    and not state.is_open
+                ):
+                    logger.warning(
+                        f"Opening circuit for proxy {state.url.split('@')[-1]}"
+                    )
+                    state.opened_at = time.monotonic()
+
+    def _attempt(self, state: ProxyState, fn: Callable[[Dict[str, str]], T]) -> T:
+        start = time.monotonic()
+        try:
+            result = fn(state.proxies)
+        except self.proxy_errors:
+            PROXY_ATTEMPTS.labels("failure").inc()
+            self.record(state, False, time.monotonic() - start)
+            raise
+        except Exception:
+            # The upstream answered through this proxy, so it is healthy
+            PROXY_ATTEMPTS.labels("success").inc()
+            self.record(state, True, time.monotonic() - start)
+            raise
+        PROXY_ATTEMPTS.labels("success").inc()
+        self.record(state, True, time.monotonic() - start)
+        return result
+
+    def run(self, fn: Callable[[Dict[str, str]], T]) -> T:
+        """Call `fn(proxies)` through the best proxies, returning the first success."""
+        candidates = self.ranked()
+        in_flight = set()
+        last_error: Optional[Exception] = None
+
+        while candidates or in_flight:
+            if candidates and len(in_flight) < self.top_k:
+                in_flight.add(
+                    self._executor.submit(self._attempt, candidates.pop(0), fn)
+                )
+
+            # Wait for a result, hedging with the next proxy after `hedge_delay`
+            timeout = self.hedge_delay if candidates else None
+            done, in_flight = wait(
+                in_flight, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                error = future.exception()
+                if error is None or not isinstance(error, self.proxy_errors):
+                    # A result, or an upstream error another proxy would repeat
+                    return future.result()
+                last_error = error
+                logger.error(f"Proxy failed: {last_error}")
+
+        raise last_error
+
+    def probe(self):
+        """Try every open-circuit proxy once, closing the circuit on success."""
+        with self._lock:
+            open_states = [state for state in self.states if state.is_open]
+        for state in open_states:
+            try:
+                self._attempt(
+                    state,
+                    lambda proxies: requests.get(
+                        self.probe_url, proxies=proxies, timeout=self.probe_timeout
+                    ).raise_for_status(),
+                )
+                logger.info(f"Proxy {state.url.split('@')[-1]} recovered")
+            except Exception:
+                continue
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            self.probe()
+
+    def start(self):
+        if self._probe_thread is None:
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name="proxy-probe", daemon=True
+            )
+            self._probe_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    "proxy": state.url.split("@")[-1],
+                    "latency": round(state.latency, 3),
+                    "success_rate": round(state.success_rate, 3),
+                    "circuit_open": state.is_open,
+                }
+                for state in self.states
+            ]
@@ -0,0 +1,54 @@
+"""Gunicorn settings for serving the API from several uvicorn worker processes.
+
+    gunicorn api.app:app -c gunicorn.conf.py
+
+Workers share sessions through Redis (SESSION_BACKEND=redis) and per-video
+FAISS indexes through INDEX_DIR on shared disk, so /qa works on any worker.
+"""
+
+import gc
+import os
+import multiprocessing
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app in the master so workers fork with it already loaded
+preload_app = True
+
+# Split the cores between workers so their torch thread pools do not fight
+os.environ.setdefault(
+    "EMBEDDING_NUM_THREADS", str(max(1, multiprocessing.cpu_count() // workers))
+)
+
+
+def when_ready(server):
+    if workers > 1 and os.getenv("SESSION_BACKEND", "local") != "redis":
+        server.log.warning(
+            "Running several workers with process-local sessions; set "
+            "SESSION_BACKEND=redis so /qa works on every worker"
+        )
+
+    # Load the heavy modules and model weights once; workers share them
+    # copy-on-write. Warm-up runs in each worker, since torch thread pools
+    # must not cross a fork.
+    from api.app import import_services
+    from src.embeddings import get_embedding_engine
+
+    import_services()
+    get_embedding_engine()
+    # Keep the garbage collector from touching (and so copying) shared pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges from multi-process Prometheus metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from api.replicate_api import llama3_8b
+from data.get_youtube_data import YouTubeDataFetcher
+from data.preprocess import merge_chapter_transcript
+from data.prompt_builder import max_output_tokens
+from src.summarizer import MAP_CONCURRENCY, get_summary_prompt
+from src.vectorstore import add_to_corpus
+from utils.concurrency import BoundedExecutor, RateLimiter
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_OUTPUT_DIR = Path(os.getenv("BATCH_OUTPUT_DIR", ".cache/batches"))
+TRANSCRIPT_RATE = float(os.getenv("BATCH_TRANSCRIPT_RATE", 2))
+LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", 4))
+TRANSCRIPT_CONCURRENCY = int(os.getenv("BATCH_TRANSCRIPT_CONCURRENCY", 8))
+BATCH_JOB_TTL = int(os.getenv("BATCH_JOB_TTL", 86400))
+
+
+def youtube_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+@dataclass
+class BatchJob:
+    job_id: str
+    output_path: str
+    status: str = "pending"
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def batch_executor() -> BoundedExecutor:
+    """A pool sized so the batch caps below can never overflow it."""
+    return BoundedExecutor.from_env(
+        "batch",
+        default_workers=TRANSCRIPT_CONCURRENCY + LLM_CONCURRENCY * MAP_CONCURRENCY,
+        default_pending=32,
+    )
+
+
+class BatchRunner:
+    """Summarize many videos: bulk metadata, rate-limited transcripts, capped LLM calls.
+
+    Blocking calls run on the runner's own `executor`, never on the pool that
+    serves interactive requests, and the transcript and LLM caps are shared by
+    every job, so a large playlist queues behind them instead of filling a
+    backlog. With a `corpus_index`, each video's transcript is also added to
+    the cross-video search index, one video at a time on `embed_executor`.
+
+    Finished jobs are kept for `ttl` seconds, along with the results files the
+    runner named itself under `output_dir`.
+    """
+
+    def __init__(
+        self,
+        youtube: YouTubeDataFetcher,
+        executor: Optional[BoundedExecutor] = None,
+        output_dir: Path = BATCH_OUTPUT_DIR,
+        corpus_index=None,
+        embed_executor: Optional[BoundedExecutor] = None,
+        ttl: float = BATCH_JOB_TTL,
+    ):
+        self.youtube = youtube
+        self.executor = executor or batch_executor()
+        self.corpus_index = corpus_index
+        self.embed_executor = embed_executor or self.executor
+        self.transcript_slots = asyncio.Semaphore(TRANSCRIPT_CONCURRENCY)
+        self.llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+        self.embed_slots = asyncio.Semaphore(1)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.jobs: Dict[str, BatchJob] = {}
+        # Finished job IDs, oldest first, with when they finished
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._tasks = set()
+
+    def create_job(self, output_path: Optional[str] = None) -> BatchJob:
+        self.reap()
+        job_id = str(uuid.uuid4())
+        job = BatchJob(
+            job_id=job_id,
+            output_path=output_path or str(self.output_dir / f"{job_id}.jsonl"),
+        )
+        self.jobs[job_id] = job
+        return job
+
+    def start(
+        self, job: BatchJob, youtube_urls: List[str], playlist_id: Optional[str] = None
+    ) -> asyncio.Task:
+        """Run `job` in the background, holding a reference until it finishes."""
+        task = asyncio.create_task(self.run(job, youtube_urls, playlist_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def get_job(self, job_id: str) -> Optional[BatchJob]:
+        self.reap()
+        return self.jobs.get(job_id)
+
+    def reap(self):
+        """Forget jobs that finished more than `ttl` seconds ago."""
+        cutoff = time.monotonic() - self.ttl
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if finished > cutoff:
+                break
+            self._finished.popitem(last=False)
+            job = self.jobs.pop(job_id, None)
+            if job is not None and Path(job.output_path).parent == self.output_dir:
+                Path(job.output_path).unlink(missing_ok=True)
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def resolve_video_ids(
+        self, youtube_urls: List[str], playlist_id: Optional[str]
+    ) -> List[str]:
+        video_ids = []
+        for url in youtube_urls:
+            video_id = self.youtube.extract_video_id(url)
+            if not video_id:
+                raise ValueError(f"Could not extract valid video ID from URL: {url}")
+            video_ids.append(video_id)
+        if playlist_id:
+            video_ids.extend(
+                await self.executor.run(
+                    self.youtube.get_playlist_video_ids, playlist_id
+                )
+            )
+        # Keep the first occurrence of each video
+        return list(dict.fromkeys(video_ids))
+
+    async def run(
+        self,
+        job: BatchJob,
+        youtube_urls: List[str],
+        playlist_id: Optional[str] = None,
+    ):
+        job.status = "running"
+        try:
+            video_ids = await self.resolve_video_ids(youtube_urls, playlist_id)
+            job.total = len(video_ids)
+
+            cached = {
+                video_id: self.youtube.get_cached_meta_data(video_id)
+                for video_id in video_ids
+            }
+            missing = [video_id for video_id, meta in cached.items() if meta is None]
+            snippets = await self.executor.run(self.youtube.get_video_snippets, missing)
+
+            rate_limiter = RateLimiter(TRANSCRIPT_RATE, burst=int(TRANSCRIPT_RATE) or 1)
+            with open(job.output_path, "w") as output:
+                await asyncio.gather(
+                    *(
+                        self.process_video(
+                            job,
+                            video_id,
+                            cached[video_id],
+                            snippets.get(video_id),
+                            rate_limiter,
+                            output,
+                        )
+                        for video_id in video_ids
+                    )
+                )
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Batch job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            self._finished[job.job_id] = time.monotonic()
+
+    async def process_video(
+        self, job, video_id, meta_data, snippet, rate_limiter, output
+    ):
+        record = {"video_id": video_id, "youtube_url": youtube_url(video_id)}
+        try:
+            if meta_data is None:
+                if snippet is None:
+                    raise ValueError(f"No video found for ID: {video_id}")
+                async with self.transcript_slots:
+                    await rate_limiter.acquire()
+                    meta_data = await self.executor.run(
+                        self.youtube.build_meta_data, video_id, snippet
+                    )
+
+            chapter_transcript = await self.executor.run(
+                merge_chapter_transcript, meta_data
+            )
+            async with self.llm_slots:
+                prompt = await get_summary_prompt(
+                    meta_data, chapter_transcript, llama3_8b, self.executor
+                )
+                summary = await self.executor.run(
+                    llama3_8b, prompt, max_output_tokens(prompt)
+                )
+            if self.corpus_index is not None:
+                async with self.embed_slots:
+                    await self.embed_executor.run(
+                        add_to_corpus, meta_data, chapter_transcript, self.corpus_index
+                    )
+
+            record.update(
+                title=meta_data.title,
+                channel_name=meta_data.channel_name,
+                publish_date=meta_data.publish_date,
+                summary=summary,
+            )
+            job.completed += 1
+        except Exception as e:
+            logger.error(f"Failed to summarize {video_id}: {e}")
+            record["error"] = str(e)
+            job.failed += 1
+
+        # Writes happen on the event loop thread, so lines never interleave
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize many YouTube videos")
+    parser.add_argument("urls", nargs="*", help="YouTube video URLs")
+    parser.add_argument("--playlist", help="YouTube playlist ID")
+    parser.add_argument("--output", required=True, help="JSONL output path")
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Also add every transcript to the cross-video search index",
+    )
+    args = parser.parse_args()
+    if not args.urls and not args.playlist:
+        parser.error("Provide video URLs and/or --playlist")
+
+    async def run():
+        corpus_index = None
+        if args.index:
+            from src.corpus_index import get_corpus_index
+            from src.embeddings import (
+                EmbeddingService,
+                get_embedding_cache,
+                get_embedding_engine,
+            )
+
+            corpus_index = get_corpus_index(
+                EmbeddingService(get_embedding_engine(), get_embedding_cache())
+            )
+        runner = BatchRunner(YouTubeDataFetcher(), corpus_index=corpus_index)
+        job = runner.create_job(args.output)
+        task = runner.start(job, args.urls, args.playlist)
+        while not task.done():
+            await asyncio.wait({task}, timeout=5)
+            logger.info(
+                f"{job.completed + job.failed}/{job.total} videos done "
+                f"({job.failed} failed)"
+            )
+        runner.executor.shutdown()
+        if corpus_index is not None:
+            corpus_index.close()
+        return job
+
+    job = asyncio.run(run())
+    if job.status != "completed":
+        raise SystemExit(f"Batch failed: {job.error}")
+
+
+if __name__ == "__main__":
+    main()
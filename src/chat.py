@@ -1,19 +1,56 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
 from langchain.chains import ConversationalRetrievalChain
-from langchain_community.llms import Replicate
+from langchain_core.language_models.llms import LLM
+from langchain_community.llms.utils import enforce_stop_tokens
 
+from api.replicate_api import LLAMA3_8B, run_model
+from utils.metrics import timed
 
-def get_chat_chain(retriever):
-    llm = Replicate(
-        model="meta/meta-llama-3-8b-instruct",
-        model_kwargs={"temperature": 0.0, "top_p": 1, "max_new_tokens": 500},
+
+class ReplicateLLM(LLM):
+    """LangChain LLM that calls Replicate through the shared, pooled client."""
+
+    model: str = LLAMA3_8B
+    model_kwargs: Dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "replicate-pooled"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "model_kwargs": self.model_kwargs}
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> str:
+        output = run_model(self.model, self.model_kwargs, prompt)
+        return enforce_stop_tokens(output, stop) if stop else output
+
+
+@lru_cache(maxsize=None)
+def get_chat_llm() -> ReplicateLLM:
+    """One LLM for every session's chain; it holds no per-session state."""
+    return ReplicateLLM(
+        model=LLAMA3_8B,
+        model_kwargs={"temperature": 0.0, "top_p": 1, "max_tokens": 500},
     )
 
+
+def get_chat_chain(retriever):
     chat_chain = ConversationalRetrievalChain.from_llm(
-        llm, retriever, return_source_documents=True
+        get_chat_llm(), retriever, return_source_documents=True
     )
     return chat_chain
 
 
+@timed("chat")
 def chat(query, chat_chain, chat_history):
     response = chat_chain({"question": query, "chat_history": chat_history})
     # Update chat history
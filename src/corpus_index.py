@@ -0,0 +1,399 @@
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from src.embeddings import EmbeddingService, embedding_id
+from src.index_factory import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    INDEX_METRIC,
+    INDEX_STORAGE,
+    METRICS,
+    STORAGE_TYPES,
+    index_bytes,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# flat (exact) or hnsw; none disables the cross-video index. IVF-PQ is not
+# offered because its codebooks are trained once and would go stale as
+# videos are appended.
+CORPUS_INDEX_TYPE = os.getenv("CORPUS_INDEX_TYPE", "flat")
+# New chunks appended before the in-memory index is snapshotted to disk
+CORPUS_SNAPSHOT_EVERY = int(os.getenv("CORPUS_SNAPSHOT_EVERY", 5000))
+# Filtered searches over fewer than this many times k chunks skip the index
+# and score every candidate, since HNSW can miss matches of a narrow filter
+EXACT_SEARCH_FACTOR = int(os.getenv("CORPUS_EXACT_SEARCH_FACTOR", 10))
+
+CORPUS_INDEX_TYPES = ("flat", "hnsw", "none")
+
+
+@dataclass
+class CorpusHit:
+    video_id: str
+    title: str
+    channel: str
+    publish_date: str
+    chapter: Optional[str]
+    start: Optional[float]
+    end: Optional[float]
+    text: str
+    score: float
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class CorpusIndex:
+    """Persistent FAISS index over the transcript chunks of every video seen.
+
+    SQLite is the source of truth: one row per video (title, channel, publish
+    date) and one per chunk (chapter, start/end seconds, text and an fp16 copy
+    of its vector). The FAISS index maps chunk row IDs to vectors and is
+    periodically snapshotted next to the database. Adding a video only
+    appends rows; before each add or search, an index appends any rows newer
+    than the ones it holds, whether written by another worker or after its
+    last snapshot, so it never has to be rebuilt.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        path: Optional[Path] = None,
+        index_type: str = CORPUS_INDEX_TYPE,
+        storage: str = INDEX_STORAGE,
+        metric: str = INDEX_METRIC,
+    ):
+        if index_type not in ("flat", "hnsw"):
+            raise ValueError(f"Unknown CORPUS_INDEX_TYPE: {index_type}")
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown INDEX_STORAGE: {storage}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown INDEX_METRIC: {metric}")
+        self.embedding_service = embedding_service
+        self.index_type = index_type
+        self.storage = storage
+        self.metric = metric
+        # Vectors of different models are not comparable, so each gets its own
+        model_digest = hashlib.sha256(
+            embedding_id(embedding_service.embeddings).encode()
+        ).hexdigest()[:16]
+        root = path or os.getenv(
+            "CORPUS_INDEX_DIR",
+            str(Path(os.getenv("INDEX_DIR", ".cache/indexes")) / "corpus"),
+        )
+        self.path = Path(root) / model_digest
+        self.path.mkdir(parents=True, exist_ok=True)
+        # A snapshot per layout, so changing it rebuilds from the database
+        self.snapshot_path = self.path / f"{index_type}-{storage}-{metric}.faiss"
+        self._pid = None
+        self._connection = None
+        self._lock = threading.Lock()
+        self._index: Optional[faiss.Index] = None
+        self._last_id = 0
+        self._unsaved = 0
+
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                title TEXT,
+                channel TEXT,
+                publish_date TEXT,
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS videos_channel_date
+                ON videos (channel, publish_date);
+            CREATE INDEX IF NOT EXISTS videos_date ON videos (publish_date);
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id TEXT NOT NULL REFERENCES videos (video_id),
+                chapter TEXT,
+                start REAL,
+                end REAL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_video_id ON chunks (video_id);
+            """
+        )
+        self._conn.commit()
+        self._load_snapshot()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each worker process opens its own
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                str(self.path / "corpus.sqlite"), timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def _new_index(self, dimension: int) -> faiss.Index:
+        faiss_metric = METRICS[self.metric]
+        quantizer_type = STORAGE_TYPES[self.storage]
+        if self.index_type == "hnsw":
+            if quantizer_type is None:
+                index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss_metric)
+            else:
+                index = faiss.IndexHNSWSQ(
+                    dimension, quantizer_type, HNSW_M, faiss_metric
+                )
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        elif quantizer_type is None:
+            index = faiss.IndexFlat(dimension, faiss_metric)
+        else:
+            index = faiss.IndexScalarQuantizer(dimension, quantizer_type, faiss_metric)
+        # fp32 and fp16 need no training; int8 learns its value ranges from
+        # the first video, which clips later outliers slightly
+        return faiss.IndexIDMap2(index)
+
+    def _load_snapshot(self):
+        if not self.snapshot_path.exists():
+            return
+        try:
+            index = faiss.read_index(str(self.snapshot_path))
+        except RuntimeError as e:
+            logger.warning(f"Ignoring unreadable corpus snapshot: {e}")
+            return
+        ids = faiss.vector_to_array(index.id_map)
+        self._index = index
+        self._last_id = int(ids.max()) if len(ids) else 0
+        logger.info(f"Loaded corpus index with {index.ntotal} chunks")
+
+    def _sync(self):
+        """Append chunk rows newer than the index; call with `_lock` held."""
+        rows = self._conn.execute(
+            "SELECT id, vector FROM chunks WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        vectors = np.stack(
+            [np.frombuffer(row[1], dtype=np.float16) for row in rows]
+        ).astype(np.float32)
+        if self._index is None:
+            self._index = self._new_index(vectors.shape[1])
+            if not self._index.is_trained:
+                self._index.train(vectors)
+        self._index.add_with_ids(vectors, ids)
+        self._last_id = int(ids[-1])
+        self._unsaved += len(ids)
+        if self._unsaved >= CORPUS_SNAPSHOT_EVERY:
+            self._save_snapshot()
+
+    def _save_snapshot(self):
+        if self._index is None or not self._unsaved:
+            return
+        # Write to a temporary file first so readers never see a partial index
+        tmp_path = self.snapshot_path.with_name(
+            f"{self.snapshot_path.name}.tmp-{os.getpid()}"
+        )
+        faiss.write_index(self._index, str(tmp_path))
+        os.replace(tmp_path, self.snapshot_path)
+        self._unsaved = 0
+
+    def contains(self, video_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return row is not None
+
+    def add_video(self, meta_data, documents: List[Document]) -> int:
+        """Append a video's transcript chunks; return how many were added.
+
+        A video already in the corpus is skipped, so each is embedded once.
+        """
+        documents = [doc for doc in documents if doc.page_content.strip()]
+        if not documents or self.contains(meta_data.video_id):
+            return 0
+        vectors = self.embedding_service.embed([doc.page_content for doc in documents])
+        if self.metric == "ip":
+            faiss.normalize_L2(vectors)
+        rows = [
+            (
+                meta_data.video_id,
+                doc.metadata.get("chapter"),
+                doc.metadata.get("start"),
+                doc.metadata.get("end"),
+                doc.page_content,
+                vector.astype(np.float16).tobytes(),
+            )
+            for doc, vector in zip(documents, vectors)
+        ]
+
+        with self._lock:
+            conn = self._conn
+            with conn:
+                # The insert takes SQLite's write lock, so two workers adding
+                # the same video cannot both get past this check
+                added = conn.execute(
+                    "INSERT OR IGNORE INTO videos "
+                    "(video_id, title, channel, publish_date, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        meta_data.video_id,
+                        meta_data.title,
+                        meta_data.channel_name,
+                        meta_data.publish_date,
+                        time.time(),
+                    ),
+                ).rowcount
+                if added:
+                    conn.executemany(
+                        "INSERT INTO chunks "
+                        "(video_id, chapter, start, end, text, vector) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            self._sync()
+        if added:
+            logger.info(f"Added {len(rows)} chunks of {meta_data.video_id} to corpus")
+        return len(rows) if added else 0
+
+    def _filtered_ids(
+        self,
+        channel: Optional[str],
+        published_after: Optional[str],
+        published_before: Optional[str],
+    ) -> np.ndarray:
+        conditions, params = [], []
+        if channel is not None:
+            conditions.append("v.channel = ?")
+            params.append(channel)
+        if published_after is not None:
+            conditions.append("v.publish_date >= ?")
+            params.append(published_after)
+        if published_before is not None:
+            conditions.append("v.publish_date <= ?")
+            params.append(published_before)
+        rows = self._conn.execute(
+            "SELECT c.id FROM chunks c JOIN videos v ON c.video_id = v.video_id "
+            f"WHERE {' AND '.join(conditions)}",
+            params,
+        ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def _exact_search(self, query_vector: np.ndarray, ids: np.ndarray, k: int):
+        """Score `ids` exhaustively, shaped like the result of Index.search."""
+        # Reconstructed vectors carry the index's own quantization, so the
+        # scores match those of an approximate search
+        vectors = self._index.reconstruct_batch(ids)
+        if self.metric == "ip":
+            scores = vectors @ query_vector[0]
+            order = np.argsort(-scores)[:k]
+        else:
+            scores = ((vectors - query_vector[0]) ** 2).sum(axis=1)
+            order = np.argsort(scores)[:k]
+        return scores[order][None, :], ids[order][None, :]
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        channel: Optional[str] = None,
+        published_after: Optional[str] = None,
+        published_before: Optional[str] = None,
+    ) -> List[CorpusHit]:
+        """Rank chunks across all videos by similarity to `query`.
+
+        Filters narrow the candidates before the vector search rather than
+        after. Fewer than CORPUS_EXACT_SEARCH_FACTOR * k candidates are scored
+        exhaustively, so a rare channel still gets `k` hits; HNSW may return
+        fewer for larger filtered sets, whose matches it reaches only through
+        graph neighbours that fail the filter. Dates are YYYY-MM-DD and
+        inclusive. Scores are squared L2 distances (lower is closer), or
+        cosine similarities when INDEX_METRIC is `ip`.
+        """
+        query_vector = np.array(
+            [self.embedding_service.embeddings.embed_query(query)], dtype=np.float32
+        )
+        if self.metric == "ip":
+            faiss.normalize_L2(query_vector)
+
+        with self._lock:
+            self._sync()
+            if self._index is None or self._index.ntotal == 0:
+                return []
+            candidates = None
+            filters = (channel, published_after, published_before)
+            if any(value is not None for value in filters):
+                candidates = self._filtered_ids(*filters)
+                if not len(candidates):
+                    return []
+            if candidates is not None and len(candidates) < EXACT_SEARCH_FACTOR * k:
+                scores, ids = self._exact_search(query_vector, candidates, k)
+            else:
+                selector = None
+                if candidates is not None:
+                    selector = faiss.IDSelectorBatch(candidates)
+                if self.index_type == "hnsw":
+                    params = faiss.SearchParametersHNSW(
+                        sel=selector, efSearch=max(HNSW_EF_SEARCH, k)
+                    )
+                else:
+                    params = faiss.SearchParameters(sel=selector)
+                scores, ids = self._index.search(query_vector, k, params=params)
+
+            found = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+            if not found:
+                return []
+            placeholders = ",".join("?" * len(found))
+            rows = self._conn.execute(
+                "SELECT c.id, c.video_id, v.title, v.channel, v.publish_date, "
+                "c.chapter, c.start, c.end, c.text "
+                "FROM chunks c JOIN videos v ON c.video_id = v.video_id "
+                f"WHERE c.id IN ({placeholders})",
+                [i for i, _ in found],
+            ).fetchall()
+        by_id = {row[0]: row[1:] for row in rows}
+        return [CorpusHit(*by_id[i], score=score) for i, score in found if i in by_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            videos, chunks = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM videos), (SELECT COUNT(*) FROM chunks)"
+            ).fetchone()
+            memory = index_bytes(self._index) if self._index is not None else 0
+        return {
+            "videos": videos,
+            "chunks": chunks,
+            "index": f"{self.index_type}-{self.storage}-{self.metric}",
+            "index_bytes": memory,
+        }
+
+    def close(self):
+        """Snapshot appended chunks so the next start loads them from disk."""
+        with self._lock:
+            self._save_snapshot()
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._pid = None
+
+
+def get_corpus_index(embedding_service: EmbeddingService) -> Optional[CorpusIndex]:
+    """The cross-video index, or None when CORPUS_INDEX_TYPE is `none`."""
+    if CORPUS_INDEX_TYPE not in CORPUS_INDEX_TYPES:
+        raise ValueError(
+            f"Unknown CORPUS_INDEX_TYPE: {CORPUS_INDEX_TYPE}, "
+            f"expected one of {', '.join(CORPUS_INDEX_TYPES)}"
+        )
+    if CORPUS_INDEX_TYPE == "none":
+        return None
+    return CorpusIndex(embedding_service)
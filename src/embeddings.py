@@ -0,0 +1,220 @@
+import os
+import time
+import hashlib
+import logging
+import platform
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from utils.cache import Cache, SQLiteCache
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+# Short names for EMBEDDING_MODEL
+MODEL_ALIASES = {
+    "mpnet": DEFAULT_EMBEDDING_MODEL,
+    "minilm": "sentence-transformers/all-MiniLM-L6-v2",
+    "minilm-l12": "sentence-transformers/all-MiniLM-L12-v2",
+}
+# torch: the PyTorch model. onnx: its ONNX Runtime export. onnx-int8: the
+# dynamically int8-quantized export the sentence-transformers models publish.
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def default_int8_file() -> str:
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    # Runs on any AVX2 CPU; set EMBEDDING_ONNX_FILE for the avx512 variants
+    return "onnx/model_quint8_avx2.onnx"
+
+
+class EmbeddingEngine(Embeddings):
+    """Process-wide embedding model, loaded once and shared by every request."""
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        num_threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
+        model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self.model_name = MODEL_ALIASES.get(model_name, model_name)
+        self.backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+        if self.backend not in EMBEDDING_BACKENDS:
+            raise ValueError(
+                f"Unknown EMBEDDING_BACKEND: {self.backend}, "
+                f"expected one of {', '.join(EMBEDDING_BACKENDS)}"
+            )
+        # 0 keeps the runtime's default (one thread per physical core)
+        self.num_threads = int(num_threads or os.getenv("EMBEDDING_NUM_THREADS", 0))
+        self.batch_size = int(batch_size or os.getenv("EMBEDDING_BATCH_SIZE", 32))
+
+        self._set_threads()
+        self.model = HuggingFaceEmbeddings(
+            model_name=self.model_name,
+            model_kwargs=self._model_kwargs(),
+            encode_kwargs={"batch_size": self.batch_size},
+        )
+
+    @property
+    def embedding_id(self) -> str:
+        """Identifies the vectors this engine produces, for cache and index keys."""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}:{self.backend}"
+
+    def _model_kwargs(self) -> Dict:
+        if self.backend == "torch":
+            return {}
+        if importlib.util.find_spec("onnxruntime") is None:
+            raise ImportError(
+                f"EMBEDDING_BACKEND={self.backend} needs ONNX Runtime: "
+                "pip install 'optimum[onnxruntime]'"
+            )
+        import onnxruntime
+
+        onnx_kwargs = {}
+        if self.backend == "onnx-int8":
+            onnx_kwargs["file_name"] = os.getenv(
+                "EMBEDDING_ONNX_FILE", default_int8_file()
+            )
+        elif os.getenv("EMBEDDING_ONNX_FILE"):
+            onnx_kwargs["file_name"] = os.getenv("EMBEDDING_ONNX_FILE")
+        if self.num_threads > 0:
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            onnx_kwargs["session_options"] = options
+        return {"backend": "onnx", "model_kwargs": onnx_kwargs}
+
+    def _set_threads(self):
+        if self.num_threads > 0:
+            import torch
+
+            torch.set_num_threads(self.num_threads)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Like `embed_documents`, but as float32 numpy without a list round trip."""
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.model.client.encode(
+            texts, convert_to_numpy=True, **self.model.encode_kwargs
+        ).astype(np.float32, copy=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+    def warm_up(self):
+        """Run one full batch through the model so the first request is not slower."""
+        # Thread settings do not survive a fork, so each worker applies them again
+        self._set_threads()
+        start = time.perf_counter()
+        self.embed_documents(["warm up"] * self.batch_size)
+        logger.info(
+            f"Embedding model {self.embedding_id} warmed up in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+
+@lru_cache(maxsize=None)
+def get_embedding_engine() -> EmbeddingEngine:
+    """Return the process-wide engine.
+
+    Under gunicorn with preload, the master builds it before forking so the
+    model weights are shared copy-on-write by every worker.
+    """
+    return EmbeddingEngine()
+
+
+def embedding_id(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "embedding_id", None) or getattr(
+        embeddings, "model_name", type(embeddings).__name__
+    )
+
+
+class EmbeddingService:
+    """Embeds texts for index building in length-sorted batches, with a vector cache.
+
+    Identical texts are embedded once per call. Vectors are cached on disk by
+    model and text hash, so repeated strings, such as a channel name or a
+    re-summarized video, are never embedded twice.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: Optional[Cache] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = int(
+            batch_size
+            or getattr(embeddings, "batch_size", None)
+            or os.getenv("EMBEDDING_BATCH_SIZE", 32)
+        )
+        self.embedding_id = embedding_id(embeddings)
+
+    def cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.embedding_id}\0{text}".encode()).hexdigest()
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        if hasattr(self.embeddings, "embed_array"):
+            return self.embeddings.embed_array(texts)
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), dimension) float32 array."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        unique = list(dict.fromkeys(texts))
+        keys = {text: self.cache_key(text) for text in unique}
+        cached = self.cache.get_many(keys.values()) if self.cache is not None else {}
+        vectors: Dict[str, np.ndarray] = {
+            text: np.frombuffer(cached[key], dtype=np.float32)
+            for text, key in keys.items()
+            if key in cached
+        }
+
+        # Similar lengths per batch means less padding inside the model
+        missing = sorted((text for text in unique if text not in vectors), key=len)
+        new_vectors = {}
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            for text, vector in zip(batch, self._embed_batch(batch)):
+                vectors[text] = vector
+                new_vectors[keys[text]] = vector.tobytes()
+        if self.cache is not None:
+            self.cache.set_many(new_vectors)
+
+        if missing:
+            logger.info(
+                f"Embedded {len(missing)} of {len(texts)} texts "
+                f"({len(texts) - len(unique)} duplicates, {len(cached)} cached)"
+            )
+        return np.stack([vectors[text] for text in texts])
+
+
+def get_embedding_cache() -> Optional[Cache]:
+    """Disk cache of vectors, or None when EMBEDDING_CACHE_MAX_ENTRIES is 0."""
+    max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200_000))
+    if max_entries <= 0:
+        return None
+    cache_dir = Path(os.getenv("CACHE_DIR", ".cache"))
+    # Vectors of a fixed model never go stale, so entries do not expire
+    return SQLiteCache(
+        cache_dir / "embeddings.sqlite",
+        ttl=None,
+        max_entries=max_entries,
+        name="embeddings",
+    )
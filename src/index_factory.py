@@ -0,0 +1,168 @@
+import os
+import math
+import logging
+import warnings
+from typing import Dict
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+
+logger = logging.getLogger(__name__)
+
+# auto picks flat, HNSW or IVF-PQ from the number of vectors
+INDEX_TYPE = os.getenv("INDEX_TYPE", "auto")
+# Vector storage for flat and HNSW indexes; IVF-PQ always stores PQ codes
+INDEX_STORAGE = os.getenv("INDEX_STORAGE", "fp16")
+# l2, or ip for inner product over L2-normalized vectors (cosine similarity)
+INDEX_METRIC = os.getenv("INDEX_METRIC", "l2")
+HNSW_MIN_VECTORS = int(os.getenv("INDEX_HNSW_MIN_VECTORS", 20_000))
+IVFPQ_MIN_VECTORS = int(os.getenv("INDEX_IVFPQ_MIN_VECTORS", 200_000))
+HNSW_M = int(os.getenv("INDEX_HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.getenv("INDEX_HNSW_EF_CONSTRUCTION", 80))
+HNSW_EF_SEARCH = int(os.getenv("INDEX_HNSW_EF_SEARCH", 64))
+IVF_NPROBE = int(os.getenv("INDEX_IVF_NPROBE", 16))
+# PQ code bytes per vector; 0 means one byte per four dimensions
+PQ_BYTES = int(os.getenv("INDEX_PQ_BYTES", 0))
+# k-means needs a few hundred vectors per PQ centroid to train well
+IVFPQ_MIN_TRAIN = 10_000
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivfpq")
+STORAGE_TYPES = {
+    "fp32": None,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+
+# Part of the index key, so indexes built with another layout are not reused
+INDEX_VARIANT = f"{INDEX_TYPE}-{INDEX_STORAGE}-{INDEX_METRIC}"
+
+
+def choose_index_type(num_vectors: int, index_type: str = INDEX_TYPE) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown INDEX_TYPE: {index_type}, "
+            f"expected one of {', '.join(INDEX_TYPES)}"
+        )
+    if index_type == "auto":
+        if num_vectors >= IVFPQ_MIN_VECTORS:
+            index_type = "ivfpq"
+        elif num_vectors >= HNSW_MIN_VECTORS:
+            index_type = "hnsw"
+        else:
+            index_type = "flat"
+    if index_type == "ivfpq" and num_vectors < IVFPQ_MIN_TRAIN:
+        logger.warning(
+            f"{num_vectors} vectors are too few to train IVF-PQ, using a flat index"
+        )
+        return "flat"
+    return index_type
+
+
+def pq_subquantizers(dimension: int, code_bytes: int = PQ_BYTES) -> int:
+    """One-byte subquantizers per code, rounded down to a divisor of `dimension`."""
+    m = min(dimension, max(1, code_bytes or dimension // 4))
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str = INDEX_TYPE,
+    storage: str = INDEX_STORAGE,
+    metric: str = INDEX_METRIC,
+) -> faiss.Index:
+    """Build and fill a FAISS index whose layout suits the number of vectors.
+
+    Small corpora, such as a single video, get an exact flat index. Larger
+    ones get HNSW, and very large ones IVF-PQ, which keeps only compact PQ
+    codes. In `ip` mode `vectors` are normalized in place.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown INDEX_STORAGE: {storage}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown INDEX_METRIC: {metric}")
+    num_vectors, dimension = vectors.shape
+    faiss_metric = METRICS[metric]
+    if metric == "ip":
+        faiss.normalize_L2(vectors)
+
+    index_type = choose_index_type(num_vectors, index_type)
+    quantizer_type = STORAGE_TYPES[storage]
+    if index_type == "flat":
+        if quantizer_type is None:
+            index = faiss.IndexFlat(dimension, faiss_metric)
+        else:
+            index = faiss.IndexScalarQuantizer(dimension, quantizer_type, faiss_metric)
+    elif index_type == "hnsw":
+        if quantizer_type is None:
+            index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss_metric)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, quantizer_type, HNSW_M, faiss_metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        nlist = min(65536, max(16, int(4 * math.sqrt(num_vectors))))
+        coarse = faiss.IndexFlat(dimension, faiss_metric)
+        index = faiss.IndexIVFPQ(
+            coarse, dimension, nlist, pq_subquantizers(dimension), 8, faiss_metric
+        )
+        index.nprobe = IVF_NPROBE
+
+    index.train(vectors)
+    index.add(vectors)
+    if index_type == "ivfpq":
+        # MMR reconstructs candidate vectors by ID
+        index.make_direct_map()
+    logger.info(
+        f"Built {type(index).__name__} over {num_vectors} vectors "
+        f"({index_bytes(index) / num_vectors:.0f} bytes per vector)"
+    )
+    return index
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Approximate memory held by an index: codes, graph links and ID maps."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        # Level 0 holds nearly all links; upper levels add about 1/M more
+        links = index.ntotal * index.hnsw.nb_neighbors(0) * 4
+        return links + index_bytes(index.storage)
+    if isinstance(index, faiss.IndexIVF):
+        # Each stored code carries an 8-byte ID, and the direct map another
+        return index.ntotal * (index.code_size + 16) + index_bytes(index.quantizer)
+    if isinstance(index, faiss.IndexIDMap):
+        return index.ntotal * 8 + index_bytes(index.index)
+    try:
+        return index.ntotal * index.sa_code_size()
+    except RuntimeError:
+        return index.ntotal * index.d * 4
+
+
+def open_vectorstore(
+    embeddings: Embeddings,
+    index: faiss.Index,
+    docstore: InMemoryDocstore,
+    index_to_docstore_id: Dict[int, str],
+) -> FAISS:
+    """Wrap `index` in a LangChain vector store that scores queries the same way."""
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        return FAISS(embeddings, index, docstore, index_to_docstore_id)
+    with warnings.catch_warnings():
+        # LangChain warns that normalize_L2 is meant for L2, but it does
+        # normalize queries, which is what cosine similarity needs
+        warnings.filterwarnings("ignore", message="Normalizing L2")
+        return FAISS(
+            embeddings,
+            index,
+            docstore,
+            index_to_docstore_id,
+            normalize_L2=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
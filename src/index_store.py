@@ -0,0 +1,158 @@
+import os
+import shutil
+import pickle
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import faiss
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+
+from src.embeddings import EmbeddingService, embedding_id, get_embedding_cache
+from src.index_factory import index_bytes, open_vectorstore
+
+logger = logging.getLogger(__name__)
+
+
+class IndexStore:
+    """Shared, reference-counted FAISS indexes persisted to disk per video.
+
+    Indexes are keyed by video ID plus a hash of the transcript and embedding
+    model, so a video is only chunked and embedded once per deployment. An index
+    stays in memory while at least one session holds it; after that it is
+    reloaded from disk on demand. Each process loads its own copy, except for
+    IVF-PQ indexes, whose codes FAISS memory-maps.
+    """
+
+    INDEX_NAME = "index"
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index_dir: Optional[Path] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        corpus_index=None,
+    ):
+        self.embeddings = embeddings
+        # Index builds embed through the batching, caching service; queries
+        # use `embeddings` directly
+        self.embedding_service = embedding_service or EmbeddingService(
+            embeddings, get_embedding_cache()
+        )
+        # Cross-video search index every retrieved video is appended to
+        self.corpus_index = corpus_index
+        self.index_dir = Path(index_dir or os.getenv("INDEX_DIR", ".cache/indexes"))
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._indexes: Dict[str, FAISS] = {}
+        self._refcounts: Dict[str, int] = {}
+        # key -> [lock, number of acquire() calls using it]
+        self._key_locks: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def index_key(self, meta_data, chapter_transcript, variant: str = "") -> str:
+        """Key for a video's index; `variant` names how it was chunked."""
+        digest = hashlib.sha256()
+        digest.update(embedding_id(self.embeddings).encode())
+        digest.update(variant.encode())
+        for part in (meta_data.title, meta_data.channel_name, meta_data.publish_date):
+            digest.update(str(part).encode())
+        for chapter in chapter_transcript:
+            digest.update(str(chapter.chapter).encode())
+            for line in chapter.transcript:
+                digest.update(line.encode())
+        return f"{meta_data.video_id}-{digest.hexdigest()[:16]}"
+
+    def acquire(self, key: str, build: Optional[Callable[[], FAISS]] = None) -> FAISS:
+        """Return the index for `key`, loading or building it if needed.
+
+        Without `build`, the index must already exist in memory or on disk.
+        """
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            # Per-key lock so concurrent sessions for one video embed it only once
+            with entry[0]:
+                return self._acquire_locked(key, build)
+        finally:
+            # The lock lives only while someone may wait on it
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    def _acquire_locked(self, key: str, build: Optional[Callable[[], FAISS]]) -> FAISS:
+        with self._lock:
+            if key in self._indexes:
+                self._refcounts[key] += 1
+                return self._indexes[key]
+
+        path = self.index_dir / key
+        if path.exists():
+            logger.info(f"Loading index {key} from disk")
+            vectorstore = self._load(path)
+        elif build is None:
+            raise KeyError(f"Index {key} does not exist")
+        else:
+            logger.info(f"Building index {key}")
+            vectorstore = build()
+            self._save(vectorstore, path)
+
+        with self._lock:
+            # Keep any copy that is already shared and count this reference on top
+            vectorstore = self._indexes.setdefault(key, vectorstore)
+            self._refcounts[key] = self._refcounts.get(key, 0) + 1
+        return vectorstore
+
+    def release(self, key: Optional[str]):
+        """Drop one reference; the index is unloaded once nothing holds it."""
+        if key is None:
+            return
+        with self._lock:
+            if key not in self._refcounts:
+                return
+            self._refcounts[key] -= 1
+            if self._refcounts[key] <= 0:
+                self._refcounts.pop(key)
+                self._indexes.pop(key, None)
+
+    def refcount(self, key: str) -> int:
+        return self._refcounts.get(key, 0)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by loaded indexes: vectors plus chunk text."""
+        with self._lock:
+            vectorstores = list(self._indexes.values())
+        total = 0
+        for vectorstore in vectorstores:
+            total += index_bytes(vectorstore.index)
+            total += sum(
+                len(doc.page_content) for doc in vectorstore.docstore._dict.values()
+            )
+        return total
+
+    def _save(self, vectorstore: FAISS, path: Path):
+        # Write to a temporary folder first so readers never see a partial index
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        vectorstore.save_local(str(tmp_path), self.INDEX_NAME)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another process finished the same index first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _load(self, path: Path) -> FAISS:
+        # FAISS memory-maps only the inverted lists of IVF indexes; flat, SQ
+        # and HNSW indexes accept the flag but are read into this process
+        index = faiss.read_index(
+            str(path / f"{self.INDEX_NAME}.faiss"),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+
+        with open(path / f"{self.INDEX_NAME}.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+        return open_vectorstore(self.embeddings, index, docstore, index_to_docstore_id)
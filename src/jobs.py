@@ -0,0 +1,497 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import logging
+import ipaddress
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from api.replicate_api import llama3_8b
+from data.get_youtube_data import YouTubeDataFetcher
+from data.preprocess import merge_chapter_transcript
+from data.prompt_builder import max_output_tokens
+from src.index_store import IndexStore
+from src.summarizer import get_summary_prompt
+from src.vectorstore import add_to_corpus_later, get_retriever
+from utils.concurrency import BoundedExecutor, ExecutorBusy
+
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL = int(os.getenv("JOB_TTL", 86400))
+# Seconds a taken job may go without a heartbeat before it is requeued
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", 300))
+# Deliveries before a job whose worker keeps dying is failed
+JOB_MAX_DELIVERIES = int(os.getenv("JOB_MAX_DELIVERIES", 3))
+# Webhooks to loopback, private and link-local addresses are refused unless set
+WEBHOOK_ALLOW_PRIVATE = os.getenv("JOB_WEBHOOK_ALLOW_PRIVATE", "0") == "1"
+
+
+def validate_webhook_url(url: str):
+    """Raise ValueError unless `url` is http(s) to public addresses only.
+
+    Checked on submit and again before each POST, since DNS can change.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"Webhook URL must be http(s) with a host: {url}")
+    if WEBHOOK_ALLOW_PRIVATE:
+        return
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or 443)
+    except socket.gaierror as e:
+        raise ValueError(f"Webhook host does not resolve: {parsed.hostname}: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(
+                f"Webhook host {parsed.hostname} resolves to non-public address {ip}"
+            )
+
+
+@dataclass
+class SummaryJob:
+    job_id: str
+    youtube_url: str
+    session_id: Optional[str] = None
+    webhook_url: Optional[str] = None
+    status: str = "queued"
+    stage: Optional[str] = None
+    # Seconds spent and attempts made per pipeline stage
+    timings: Dict[str, float] = field(default_factory=dict)
+    attempts: Dict[str, int] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    finished_at: Optional[str] = None
+    # Times a worker took the job; above 1 means a worker died while running it
+    deliveries: int = 0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class LocalJobBroker:
+    """In-process job queue for local use and single-worker deployments.
+
+    Finished jobs are kept for JOB_TTL seconds. Jobs die with the process, so
+    there is nothing to acknowledge or requeue.
+    """
+
+    def __init__(self, max_queued: int, ttl: float = JOB_TTL):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.jobs: Dict[str, SummaryJob] = {}
+        # Finished job IDs, oldest first, with when they finished
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        # save and reap run in threads
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+        return self._queue
+
+    async def put(self, job: SummaryJob):
+        try:
+            self.queue.put_nowait(job.job_id)
+        except asyncio.QueueFull:
+            raise ExecutorBusy(f"Job queue is full ({self.max_queued} queued)")
+        self.save(job)
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+    def save(self, job: SummaryJob):
+        with self._lock:
+            self.jobs[job.job_id] = job
+            if job.finished_at is not None and job.job_id not in self._finished:
+                self._finished[job.job_id] = time.monotonic()
+
+    def load(self, job_id: str) -> Optional[SummaryJob]:
+        return self.jobs.get(job_id)
+
+    def heartbeat(self, job_id: str):
+        pass
+
+    def ack(self, job_id: str):
+        pass
+
+    def reap(self):
+        """Forget jobs that finished more than `ttl` seconds ago."""
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            while self._finished:
+                job_id, finished = next(iter(self._finished.items()))
+                if finished > cutoff:
+                    break
+                self._finished.popitem(last=False)
+                self.jobs.pop(job_id, None)
+
+
+class RedisJobBroker:
+    """Job queue shared by every worker through a Redis list.
+
+    Job records are JSON strings kept for JOB_TTL seconds, so any worker can
+    answer status requests for any job. Taking a job moves it atomically to a
+    processing list and leases it for `visibility_timeout` seconds, which
+    the running worker keeps extending. Jobs are removed once acknowledged;
+    `reap` puts jobs whose lease ran out, because their worker died, back on
+    the queue.
+    """
+
+    QUEUE_KEY = "jobs:queue"
+    PROCESSING_KEY = "jobs:processing"
+    LEASES_KEY = "jobs:leases"
+    KEY_PREFIX = "job:"
+    # Only the reaper that removes the job from the processing list requeues it
+    REQUEUE_SCRIPT = """
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+        redis.call('RPUSH', KEYS[3], ARGV[1])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_queued: int,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+    ):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_queued = max_queued
+        self.visibility_timeout = visibility_timeout
+        self._requeue = self.client.register_script(self.REQUEUE_SCRIPT)
+
+    async def put(self, job: SummaryJob):
+        await asyncio.to_thread(self._put, job)
+
+    def _put(self, job: SummaryJob):
+        if self.client.llen(self.QUEUE_KEY) >= self.max_queued:
+            raise ExecutorBusy(f"Job queue is full ({self.max_queued} queued)")
+        self.save(job)
+        self.client.rpush(self.QUEUE_KEY, job.job_id)
+
+    async def get(self) -> str:
+        while True:
+            # Short blocking moves keep shutdown responsive
+            item = await asyncio.to_thread(
+                self.client.blmove, self.QUEUE_KEY, self.PROCESSING_KEY, 1
+            )
+            if item is not None:
+                job_id = item.decode()
+                await asyncio.to_thread(self.heartbeat, job_id)
+                return job_id
+
+    def heartbeat(self, job_id: str):
+        """Extend the lease on a job this worker is running."""
+        self.client.zadd(
+            self.LEASES_KEY, {job_id: time.time() + self.visibility_timeout}
+        )
+
+    def ack(self, job_id: str):
+        """Remove a job this worker has finished from the processing list."""
+        pipe = self.client.pipeline()
+        pipe.lrem(self.PROCESSING_KEY, 1, job_id)
+        pipe.zrem(self.LEASES_KEY, job_id)
+        pipe.execute()
+
+    def reap(self):
+        """Requeue taken jobs whose lease expired without an ack."""
+        # A worker that died between taking a job and leasing it left no lease
+        deadline = time.time() + self.visibility_timeout
+        for job_id in self.client.lrange(self.PROCESSING_KEY, 0, -1):
+            self.client.zadd(self.LEASES_KEY, {job_id: deadline}, nx=True)
+        expired = self.client.zrangebyscore(self.LEASES_KEY, "-inf", time.time())
+        for job_id in expired:
+            if self._requeue(
+                keys=[self.PROCESSING_KEY, self.LEASES_KEY, self.QUEUE_KEY],
+                args=[job_id],
+            ):
+                logger.warning(
+                    f"Requeued job {job_id.decode()} after its lease expired"
+                )
+
+    def save(self, job: SummaryJob):
+        self.client.set(
+            self.KEY_PREFIX + job.job_id, json.dumps(job.to_dict()), ex=JOB_TTL
+        )
+
+    def load(self, job_id: str) -> Optional[SummaryJob]:
+        value = self.client.get(self.KEY_PREFIX + job_id)
+        return SummaryJob(**json.loads(value)) if value is not None else None
+
+
+def get_job_broker():
+    """Build the broker configured by JOB_BROKER (local or redis)."""
+    broker = os.getenv("JOB_BROKER", "local")
+    max_queued = int(os.getenv("JOB_MAX_QUEUED", 1000))
+    if broker == "local":
+        return LocalJobBroker(max_queued)
+    if broker == "redis":
+        return RedisJobBroker(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"), max_queued
+        )
+    raise ValueError(f"Unknown JOB_BROKER: {broker}")
+
+
+class JobQueue:
+    """Run summarization jobs in the background with per-stage retries.
+
+    Each stage (fetch, summary, embedding) is retried with jittered
+    exponential backoff; invalid input (ValueError) fails the job at once.
+    Finished jobs keep a session with the video's index so /qa works on them.
+    Broker calls other than put/get are blocking (Redis round trips), so
+    they run in a thread.
+    """
+
+    def __init__(
+        self,
+        broker,
+        youtube: YouTubeDataFetcher,
+        io_executor: BoundedExecutor,
+        embed_executor: BoundedExecutor,
+        index_store: IndexStore,
+        session_manager,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+    ):
+        self.broker = broker
+        self.youtube = youtube
+        self.io_executor = io_executor
+        self.embed_executor = embed_executor
+        self.index_store = index_store
+        self.session_manager = session_manager
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 2))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+        self.retry_backoff = retry_backoff or float(os.getenv("JOB_RETRY_BACKOFF", 2))
+        self._tasks = []
+
+    async def submit(
+        self,
+        youtube_url: str,
+        session_id: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+    ) -> SummaryJob:
+        if webhook_url is not None:
+            await asyncio.to_thread(validate_webhook_url, webhook_url)
+        job = SummaryJob(
+            job_id=str(uuid.uuid4()),
+            youtube_url=youtube_url,
+            session_id=session_id,
+            webhook_url=webhook_url,
+        )
+        await self.broker.put(job)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[SummaryJob]:
+        return await asyncio.to_thread(self.broker.load, job_id)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job_id = await self.broker.get()
+            try:
+                job = await self.get_job(job_id)
+                # Expired, or finished by a worker that died before acking it
+                if job is not None and job.finished_at is None:
+                    await self._deliver(job)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+            # Not acked when cancelled at shutdown, so the job is requeued
+            await asyncio.to_thread(self.broker.ack, job_id)
+
+    async def _deliver(self, job: SummaryJob):
+        job.deliveries += 1
+        if job.deliveries > JOB_MAX_DELIVERIES:
+            job.status = "failed"
+            job.error = f"Abandoned after {JOB_MAX_DELIVERIES} workers stopped mid-job"
+            job.finished_at = datetime.now().isoformat()
+            await asyncio.to_thread(self.broker.save, job)
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job.job_id))
+        try:
+            await self.run(job)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+            try:
+                await asyncio.to_thread(self.broker.heartbeat, job_id)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    async def _reaper(self):
+        """Requeue jobs of workers that died and forget old finished jobs."""
+        while True:
+            await asyncio.sleep(min(60, JOB_VISIBILITY_TIMEOUT / 2))
+            try:
+                await asyncio.to_thread(self.broker.reap)
+            except Exception as e:
+                logger.error(f"Reaping jobs failed: {e}")
+
+    async def _stage(self, job: SummaryJob, name: str, fn: Callable[[], Awaitable]):
+        start = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            job.attempts[name] = attempt
+            try:
+                result = await fn()
+                break
+            except ValueError:
+                raise
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = (
+                    self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                )
+                logger.warning(
+                    f"Job {job.job_id} stage {name} attempt {attempt} failed: {e}; "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+        job.timings[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    async def run(self, job: SummaryJob):
+        job.status = "running"
+        try:
+            job.stage = "fetch"
+            await asyncio.to_thread(self.broker.save, job)
+            meta_data = await self._stage(
+                job,
+                "fetch",
+                lambda: self.io_executor.run(
+                    self.youtube.get_meta_data, job.youtube_url
+                ),
+            )
+            chapter_transcript = await self.io_executor.run(
+                merge_chapter_transcript, meta_data
+            )
+
+            async def generate_summary():
+                prompt = await get_summary_prompt(
+                    meta_data, chapter_transcript, llama3_8b, self.io_executor
+                )
+                return await self.io_executor.run(
+                    llama3_8b, prompt, max_output_tokens(prompt)
+                )
+
+            job.stage = "summarize"
+            await asyncio.to_thread(self.broker.save, job)
+            summary_result, retriever_result = await asyncio.gather(
+                self._stage(job, "summary", generate_summary),
+                self._stage(
+                    job,
+                    "embedding",
+                    lambda: self.embed_executor.run(
+                        get_retriever, meta_data, chapter_transcript, self.index_store
+                    ),
+                ),
+                return_exceptions=True,
+            )
+            if isinstance(retriever_result, BaseException):
+                raise retriever_result
+            retriever, index_key = retriever_result
+            add_to_corpus_later(
+                meta_data,
+                chapter_transcript,
+                self.index_store.corpus_index,
+                self.embed_executor,
+            )
+            if isinstance(summary_result, BaseException):
+                self.index_store.release(index_key)
+                raise summary_result
+
+            try:
+                session_id = job.session_id or await asyncio.to_thread(
+                    self.session_manager.create_session
+                )
+                await asyncio.to_thread(
+                    self.session_manager.set_session,
+                    session_id,
+                    {
+                        "youtube_url": job.youtube_url,
+                        "video_id": meta_data.video_id,
+                        "title": meta_data.title,
+                        "index_key": index_key,
+                    },
+                )
+            except BaseException:
+                self.index_store.release(index_key)
+                raise
+            self.session_manager.hold_index(session_id, index_key, retriever)
+
+            job.result = {
+                "summary": summary_result,
+                "session_id": session_id,
+                "title": meta_data.title,
+                "channel_name": meta_data.channel_name,
+                "publish_date": meta_data.publish_date,
+            }
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed at {job.stage}: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.stage = None
+            job.finished_at = datetime.now().isoformat()
+            await asyncio.to_thread(self.broker.save, job)
+
+        if job.webhook_url:
+            await self.io_executor.run(self.notify, job)
+
+    def notify(self, job: SummaryJob):
+        """POST the finished job to its webhook, retrying a few times."""
+        try:
+            validate_webhook_url(job.webhook_url)
+        except ValueError as e:
+            logger.warning(f"Not calling webhook for job {job.job_id}: {e}")
+            return
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                # Redirects could lead to an address validation did not see
+                response = requests.post(
+                    job.webhook_url,
+                    json=job.to_dict(),
+                    timeout=10,
+                    allow_redirects=False,
+                )
+                response.raise_for_status()
+                return
+            except requests.RequestException as e:
+                logger.warning(
+                    f"Webhook for job {job.job_id} failed (attempt {attempt}): {e}"
+                )
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_backoff * attempt)
@@ -0,0 +1,163 @@
+import os
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from data.preprocess import (
+    ChapterTranscript,
+    get_prompt,
+    get_section_prompt,
+    get_reduce_prompt,
+)
+from data.prompt_builder import (
+    compress_transcript,
+    count_tokens,
+    count_tokens_batch,
+    fit_prompt,
+    input_budget,
+    max_output_tokens,
+)
+
+
+logger = logging.getLogger(__name__)
+
+SECTION_TOKENS = int(os.getenv("SUMMARY_SECTION_TOKENS", 3000))
+MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4))
+SECTION_OUTPUT_TOKENS = int(os.getenv("SUMMARY_SECTION_OUTPUT_TOKENS", 500))
+
+
+def split_sections(
+    chapter_transcript: List[ChapterTranscript], max_tokens: int
+) -> List[ChapterTranscript]:
+    """Split chapters (or the single untitled chapter) into token-bounded sections."""
+    sections = []
+    for chapter in chapter_transcript:
+        windows = [[]]
+        window_tokens = 0
+        for line, line_tokens in zip(
+            chapter.transcript, count_tokens_batch(chapter.transcript)
+        ):
+            if windows[-1] and window_tokens + line_tokens > max_tokens:
+                windows.append([])
+                window_tokens = 0
+            windows[-1].append(line)
+            window_tokens += line_tokens
+
+        for i, window in enumerate(windows):
+            if chapter.chapter is None:
+                title = f"Part {len(sections) + 1}"
+            elif len(windows) > 1:
+                title = f"{chapter.chapter} (part {i + 1})"
+            else:
+                title = chapter.chapter
+            sections.append(
+                ChapterTranscript(
+                    chapter=title,
+                    timestamp=chapter.timestamp if i == 0 else None,
+                    transcript=window,
+                )
+            )
+    return sections
+
+
+def group_sections(
+    sections: List[ChapterTranscript], max_tokens: int
+) -> List[ChapterTranscript]:
+    """Merge consecutive section summaries into groups that fit `max_tokens`."""
+    groups = [[]]
+    group_tokens = 0
+    for section in sections:
+        tokens = sum(count_tokens_batch(section.transcript))
+        if groups[-1] and group_tokens + tokens > max_tokens:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].append(section)
+        group_tokens += tokens
+
+    return [
+        ChapterTranscript(
+            chapter=(
+                group[0].chapter
+                if len(group) == 1
+                else f"{group[0].chapter} to {group[-1].chapter}"
+            ),
+            timestamp=group[0].timestamp,
+            transcript=[line for section in group for line in section.transcript],
+        )
+        for group in groups
+    ]
+
+
+async def summarize_sections(
+    meta_data,
+    sections: List[ChapterTranscript],
+    llm: Callable[[str, int], str],
+    executor,
+) -> List[ChapterTranscript]:
+    """Summarize every section in parallel, at most MAP_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+    async def summarize_section(section):
+        prompt = get_section_prompt(meta_data, section)
+        async with semaphore:
+            return await executor.run(
+                llm, prompt, max_output_tokens(prompt, SECTION_OUTPUT_TOKENS)
+            )
+
+    summaries = await asyncio.gather(*(summarize_section(s) for s in sections))
+    return [
+        ChapterTranscript(
+            chapter=section.chapter, timestamp=section.timestamp, transcript=[summary]
+        )
+        for section, summary in zip(sections, summaries)
+    ]
+
+
+def first_pass(
+    meta_data, chapter_transcript: List[ChapterTranscript]
+) -> Tuple[Optional[str], List[ChapterTranscript]]:
+    """The single-pass prompt if it fits, else no prompt and the sections to map.
+
+    Compression is slightly lossy, so it only applies once the verbatim
+    transcript is over budget.
+    """
+    prompt = get_prompt(meta_data, chapter_transcript)
+    if count_tokens(prompt) <= input_budget():
+        return prompt, []
+    chapter_transcript = compress_transcript(chapter_transcript)
+    prompt = get_prompt(meta_data, chapter_transcript)
+    if count_tokens(prompt) <= input_budget():
+        return prompt, []
+    return None, split_sections(chapter_transcript, SECTION_TOKENS)
+
+
+async def get_summary_prompt(
+    meta_data, chapter_transcript, llm: Callable[[str, int], str], executor
+) -> str:
+    """Build the final summary prompt, map-reducing transcripts that do not fit.
+
+    Transcripts that fit use the single-pass prompt verbatim; others are
+    compressed first (filler sounds, repeated caption fragments), which may
+    be enough to fit. Longer ones are cut into sections (chapters, or token
+    windows without chapters) which are summarized in parallel; the partial
+    summaries are grouped and summarized again until they fit one reduce
+    prompt. Section prompts are deterministic, so their completions are reused
+    through the completion cache.
+    """
+    # Compressing and counting a multi-hour transcript takes seconds of CPU,
+    # so it runs on the executor rather than the event loop
+    prompt, sections = await executor.run(first_pass, meta_data, chapter_transcript)
+    if prompt is not None:
+        return prompt
+
+    logger.info(f"Transcript exceeds context, summarizing {len(sections)} sections")
+    summaries = await summarize_sections(meta_data, sections, llm, executor)
+
+    prompt = get_reduce_prompt(meta_data, summaries)
+    while count_tokens(prompt) > input_budget() and len(summaries) > 1:
+        groups = group_sections(summaries, SECTION_TOKENS)
+        if len(groups) == len(summaries):
+            break
+        summaries = await summarize_sections(meta_data, groups, llm, executor)
+        prompt = get_reduce_prompt(meta_data, summaries)
+    return fit_prompt(meta_data, summaries, get_reduce_prompt)
@@ -1,36 +1,164 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import os
+import uuid
+import asyncio
+import logging
+from typing import List
 
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
 
-def split_transcript(chapter_transcript):
-    # Larger chunk_size and chunk_overlap better higher level context preservation
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+from data.prompt_builder import count_tokens_batch
+from src.index_factory import INDEX_VARIANT, build_index, open_vectorstore
+from utils.concurrency import BoundedExecutor, ExecutorBusy
+from utils.metrics import INDEX_CHUNKS, stage, timed
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 128))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 16))
+# Part of the index key, so indexes built with other chunking are not reused
+CHUNKING = f"segments-{CHUNK_TOKENS}-{CHUNK_OVERLAP_TOKENS}"
+# Candidates MMR re-ranks for diversity before keeping RETRIEVER_K of them
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", 10))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", 20))
+
+# Background corpus appends, referenced until they finish
+_corpus_tasks = set()
+
+
+def split_chapter(
+    chapter, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[Document]:
+    """Pack a chapter's transcript segments into token-bounded, overlapping chunks.
+
+    Segments are never split, so every chunk keeps the start and end seconds
+    of the video it covers. Consecutive chunks share whole segments worth at
+    least `overlap_tokens`. Each segment is tokenized once and each window only
+    backs up over its overlap, so the cost is linear in the transcript length.
+    """
+    lines = chapter.transcript
+    tokens = count_tokens_batch(lines)
+    timed_lines = len(chapter.start) == len(lines)
+
+    def chunk(first: int, last: int) -> Document:
+        metadata = {"chapter": chapter.chapter, "chapter_timestamp": chapter.timestamp}
+        if timed_lines:
+            metadata["start"] = chapter.start[first]
+            metadata["end"] = chapter.end[last - 1]
+        return Document(page_content=" ".join(lines[first:last]), metadata=metadata)
+
+    chunks = []
+    first, window_tokens = 0, 0
+    for i, line_tokens in enumerate(tokens):
+        if i > first and window_tokens + line_tokens > max_tokens:
+            chunks.append(chunk(first, i))
+            # Start the next window with the closing segments of this one
+            next_first, window_tokens = i, 0
+            while next_first > first + 1 and window_tokens < overlap_tokens:
+                next_first -= 1
+                window_tokens += tokens[next_first]
+            first = next_first
+        window_tokens += line_tokens
+    if first < len(lines):
+        chunks.append(chunk(first, len(lines)))
+    return chunks
+
+
+def split_transcript(chapter_transcript) -> List[Document]:
     all_splits = []
     for chapter in chapter_transcript:
-        all_splits.extend(text_splitter.split_text(" ".join(chapter.transcript)))
+        all_splits.extend(split_chapter(chapter))
     return all_splits
 
 
-def get_vectorstore(all_splits):
+def get_vectorstore(all_splits, embedding_service):
+    """Embed the documents and build a FAISS index straight from the vectors."""
+    INDEX_CHUNKS.observe(len(all_splits))
+    with stage("embed_chunks", chunks=len(all_splits)):
+        vectors = embedding_service.embed([doc.page_content for doc in all_splits])
 
-    # Store the document into a vector store with a specific embedding model
-    vectorstore = FAISS.from_texts(
-        all_splits,
-        HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2"),
+    index = build_index(vectors)
+    ids = [str(uuid.uuid4()) for _ in all_splits]
+    return open_vectorstore(
+        embedding_service.embeddings,
+        index,
+        InMemoryDocstore(dict(zip(ids, all_splits))),
+        dict(enumerate(ids)),
     )
-    return vectorstore
 
 
-def get_retriever(meta_data, chapter_transcript):
+def get_splits(meta_data, chapter_transcript) -> List[Document]:
     all_splits = [
-        f"video title: {meta_data.title}",
-        f"youtube channel name: {meta_data.channel_name}",
-        f"video publish date: {meta_data.publish_date}",
+        Document(page_content=f"video title: {meta_data.title}"),
+        Document(page_content=f"youtube channel name: {meta_data.channel_name}"),
+        Document(page_content=f"video publish date: {meta_data.publish_date}"),
     ]
     transcript_splits = split_transcript(chapter_transcript)
     all_splits.extend(transcript_splits)
-    vectorstore = get_vectorstore(all_splits)
-    retriever = vectorstore.as_retriever(search_type="mmr", search_kwargs={"k": 10})
+    return all_splits
+
 
-    return retriever
+def add_to_corpus(meta_data, chapter_transcript, corpus_index):
+    """Append a video's chunks to the cross-video index unless it is already there.
+
+    Chunk vectors come from the embedding cache when the video was just
+    indexed for Q&A. Failures are logged, not raised, since search is a side
+    feature of summarization.
+    """
+    if corpus_index is None:
+        return
+    try:
+        if not corpus_index.contains(meta_data.video_id):
+            corpus_index.add_video(meta_data, split_transcript(chapter_transcript))
+    except Exception as e:
+        logger.warning(f"Could not add {meta_data.video_id} to the corpus index: {e}")
+
+
+def add_to_corpus_later(
+    meta_data, chapter_transcript, corpus_index, executor: BoundedExecutor
+):
+    """Run `add_to_corpus` on `executor` in the background.
+
+    Corpus maintenance (the SQLite insert, catching up the shared index and
+    its periodic snapshot) is not part of any response, so callers do not
+    wait for it. A busy executor skips the video; it is added the next time
+    it is summarized.
+    """
+    if corpus_index is None:
+        return
+
+    async def run():
+        try:
+            await executor.run(
+                add_to_corpus, meta_data, chapter_transcript, corpus_index
+            )
+        except ExecutorBusy:
+            logger.info(f"Executor busy, not adding {meta_data.video_id} to corpus")
+
+    task = asyncio.create_task(run())
+    _corpus_tasks.add(task)
+    task.add_done_callback(_corpus_tasks.discard)
+
+
+def as_retriever(vectorstore):
+    """MMR retriever with the configured k; every worker must retrieve alike."""
+    return vectorstore.as_retriever(
+        search_type="mmr",
+        search_kwargs={"k": RETRIEVER_K, "fetch_k": RETRIEVER_FETCH_K},
+    )
+
+
+@timed("get_retriever")
+def get_retriever(meta_data, chapter_transcript, index_store):
+    """Return a retriever over the shared index and the key that must be released."""
+    index_key = index_store.index_key(
+        meta_data, chapter_transcript, variant=f"{CHUNKING}-{INDEX_VARIANT}"
+    )
+    vectorstore = index_store.acquire(
+        index_key,
+        lambda: get_vectorstore(
+            get_splits(meta_data, chapter_transcript), index_store.embedding_service
+        ),
+    )
+    return as_retriever(vectorstore), index_key
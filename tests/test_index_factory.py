@@ -0,0 +1,82 @@
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.bench_index import clustered_vectors
+from src.index_factory import (
+    HNSW_MIN_VECTORS,
+    IVFPQ_MIN_TRAIN,
+    IVFPQ_MIN_VECTORS,
+    build_index,
+    choose_index_type,
+)
+
+DIMENSION = 128
+# Enough vectors to train IVF-PQ, small enough to build in a few seconds
+NUM_VECTORS = IVFPQ_MIN_TRAIN + 2_000
+NUM_QUERIES = 100
+TOP_K = 10
+
+
+@pytest.mark.parametrize(
+    "num_vectors, expected",
+    [
+        (1, "flat"),
+        (HNSW_MIN_VECTORS - 1, "flat"),
+        (HNSW_MIN_VECTORS, "hnsw"),
+        (IVFPQ_MIN_VECTORS - 1, "hnsw"),
+        (IVFPQ_MIN_VECTORS, "ivfpq"),
+        (10 * IVFPQ_MIN_VECTORS, "ivfpq"),
+    ],
+)
+def test_choose_index_type_auto_thresholds(num_vectors, expected):
+    assert choose_index_type(num_vectors, "auto") == expected
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivfpq"])
+def test_choose_index_type_keeps_explicit_type(index_type):
+    assert choose_index_type(IVFPQ_MIN_TRAIN, index_type) == index_type
+    assert choose_index_type(HNSW_MIN_VECTORS - 1, index_type) == index_type
+
+
+def test_choose_index_type_falls_back_when_too_few_to_train(monkeypatch):
+    assert choose_index_type(IVFPQ_MIN_TRAIN - 1, "ivfpq") == "flat"
+    # A low INDEX_IVFPQ_MIN_VECTORS must not select an untrainable index either
+    monkeypatch.setattr("src.index_factory.IVFPQ_MIN_VECTORS", 1_000)
+    assert choose_index_type(IVFPQ_MIN_TRAIN - 1, "auto") == "flat"
+    assert choose_index_type(IVFPQ_MIN_TRAIN, "auto") == "ivfpq"
+
+
+def test_choose_index_type_rejects_unknown_type():
+    with pytest.raises(ValueError):
+        choose_index_type(100, "annoy")
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = clustered_vectors(NUM_VECTORS + NUM_QUERIES, DIMENSION, seed=1)
+    vectors, queries = vectors[:NUM_VECTORS], vectors[NUM_VECTORS:]
+    exact = faiss.IndexFlatL2(DIMENSION)
+    exact.add(vectors)
+    _, truth = exact.search(queries, TOP_K)
+    return vectors, queries, truth
+
+
+@pytest.mark.parametrize(
+    "index_type, storage, min_recall",
+    [
+        ("flat", "fp32", 1.0),
+        ("flat", "fp16", 0.99),
+        ("hnsw", "fp16", 0.95),
+        ("ivfpq", "fp16", 0.7),
+    ],
+)
+def test_recall_at_k(corpus, index_type, storage, min_recall):
+    vectors, queries, truth = corpus
+    index = build_index(vectors.copy(), index_type, storage, "l2")
+    assert index.ntotal == NUM_VECTORS
+    _, ids = index.search(queries, TOP_K)
+    recall = np.mean(
+        [len(set(found) & set(exact)) / TOP_K for found, exact in zip(ids, truth)]
+    )
+    assert recall >= min_recall
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+
+from data.preprocess import ChapterTranscript, merge_chapter_transcript
+
+
+def make_meta_data(segments, chapters):
+    transcript = [
+        {"text": text, "start": start, "duration": duration}
+        for start, duration, text in segments
+    ]
+    return SimpleNamespace(
+        transcript={"transcript": transcript, "is_auto_generated": True},
+        chapters=chapters,
+    )
+
+
+def test_parse_chapters_reads_hours():
+    parsed = ChapterTranscript.parse_chapters(
+        ["0:00 Intro", "59:59 Almost", "1:00:00 One hour", "2:03:04 Later"]
+    )
+    assert [offset for offset, _ in parsed] == [0, 3599, 3600, 7384]
+    assert [chapter.chapter for _, chapter in parsed] == [
+        "Intro",
+        "Almost",
+        "One hour",
+        "Later",
+    ]
+    assert parsed[2][1].timestamp == "1:00:00"
+
+
+def test_parse_chapters_sorts_out_of_order_lines():
+    parsed = ChapterTranscript.parse_chapters(
+        ["1:10:00 Third", "0:00 First", "12:30 Second"]
+    )
+    assert [chapter.chapter for _, chapter in parsed] == ["First", "Second", "Third"]
+
+
+def test_parse_chapters_keeps_first_duplicate():
+    parsed = ChapterTranscript.parse_chapters(
+        ["0:00 Intro", "5:00 Setup", "05:00 Setup again", "0:05:00 Setup once more"]
+    )
+    assert [offset for offset, _ in parsed] == [0, 300]
+    assert parsed[1][1].chapter == "Setup"
+
+
+@pytest.mark.parametrize(
+    "line, title",
+    [
+        ("3:15 - Q&A - part one", "Q&A - part one"),
+        ("3:15 – Well-known results", "Well-known results"),
+        ("3:15—Pre-training vs fine-tuning", "Pre-training vs fine-tuning"),
+        ("3:15 2-for-1 deals", "2-for-1 deals"),
+    ],
+)
+def test_parse_chapters_keeps_dashes_in_titles(line, title):
+    [(offset, chapter)] = ChapterTranscript.parse_chapters([line])
+    assert offset == 195
+    assert chapter.chapter == title
+
+
+def test_parse_chapters_rejects_lines_without_timestamp():
+    with pytest.raises(ValueError):
+        ChapterTranscript.parse_chapters(["0:00 Intro", "Outro"])
+
+
+def test_merge_assigns_segments_across_hours():
+    meta_data = make_meta_data(
+        segments=[
+            (0.0, 5.0, "welcome"),
+            (1800.0, 5.0, "first half"),
+            (3599.5, 5.0, "just before the hour"),
+            (3600.0, 5.0, "on the hour"),
+            (5400.0, 5.0, "ninety minutes"),
+            (7383.9, 5.0, "just before"),
+            (7384.0, 5.0, "later on"),
+            (10800.0, 5.0, "three hours in"),
+        ],
+        chapters=["2:03:04 Later", "0:00 Intro", "1:00:00 Hour one"],
+    )
+    merged = merge_chapter_transcript(meta_data)
+    assert [chapter.chapter for chapter in merged] == ["Intro", "Hour one", "Later"]
+    assert merged[0].transcript == ["welcome", "first half", "just before the hour"]
+    assert merged[1].transcript == ["on the hour", "ninety minutes", "just before"]
+    assert merged[2].transcript == ["later on", "three hours in"]
+    assert merged[1].start == [3600.0, 5400.0, 7383.9]
+    assert merged[2].end == [7389.0, 10805.0]
+
+
+def test_merge_puts_segments_before_first_chapter_in_it():
+    meta_data = make_meta_data(
+        segments=[
+            (10.0, 2.0, "cold open"),
+            (4000.0, 2.0, "[Music] main part"),
+            (4001.0, 2.0, "[Applause]"),
+        ],
+        chapters=["1:00:00 Main"],
+    )
+    [chapter] = merge_chapter_transcript(meta_data)
+    assert chapter.chapter == "Main"
+    # Annotation-only segments are dropped, the rest keep their order
+    assert chapter.transcript == ["cold open", "main part"]
+
+
+def test_merge_without_chapters_returns_single_chapter():
+    meta_data = make_meta_data(
+        segments=[(0.0, 1.0, "a"), (4000.0, 1.0, "b")], chapters=[]
+    )
+    [chapter] = merge_chapter_transcript(meta_data)
+    assert chapter.chapter is None
+    assert chapter.transcript == ["a", "b"]
+    assert chapter.end == [1.0, 4001.0]
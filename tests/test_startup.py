@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import HEAVY_IMPORTS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = "import json, sys; import api.app; print(json.dumps(sorted(sys.modules)))"
+
+
+def test_api_import_skips_heavy_modules():
+    # A fresh interpreter, so modules imported by other tests do not count
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT},
+    ).stdout
+    loaded = set(json.loads(output.strip().splitlines()[-1]))
+    assert sorted(loaded.intersection(HEAVY_IMPORTS)) == []
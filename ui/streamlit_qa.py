@@ -1,9 +1,17 @@
 import os
+import json
 import streamlit as st
 import requests
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:5001")
 
+STAGE_LABELS = {
+    "fetch": "Fetching video and transcript...",
+    "merge": "Preparing transcript...",
+    "embedding": "Indexing transcript for Q&A...",
+    "summary": "Writing summary...",
+}
+
 
 def initialize_session():
     """Initialize a new session and store the session_id in session_state."""
@@ -17,6 +25,33 @@ def initialize_session():
             st.session_state.session_id = None
 
 
+def stream_summary(youtube_url, status):
+    """Yield summary tokens from the backend's server-sent event stream."""
+    with requests.post(
+        f"{BACKEND_URL}/summarize/stream",
+        json={"youtube_url": youtube_url, "session_id": st.session_state.session_id},
+        stream=True,
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(response.json().get("detail"))
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:") :])
+                if event == "status":
+                    status.update(label=STAGE_LABELS.get(data["stage"], data["stage"]))
+                elif event == "token":
+                    yield data["text"]
+                elif event == "done":
+                    status.update(label="Summary complete", state="complete")
+                elif event == "error":
+                    status.update(label="Summarization failed", state="error")
+                    raise RuntimeError(data["detail"])
+
+
 def main():
     st.title("YouTube Summarizer")
 
@@ -54,23 +89,11 @@ def main():
             # Summarize the video if it's a YouTube URL
             with st.chat_message("assistant"):
                 try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/summarize",
-                        json={
-                            "youtube_url": prompt,
-                            "session_id": st.session_state.session_id,
-                        },
+                    status = st.status("Summarizing...")
+                    summary = st.write_stream(stream_summary(prompt, status))
+                    st.session_state.messages.append(
+                        {"role": "assistant", "content": summary}
                     )
-                    result = response.json()
-                    if response.status_code == 200:
-                        if "response" in result:
-                            summary = result["response"]
-                            st.write(summary)
-                            st.session_state.messages.append(
-                                {"role": "assistant", "content": summary}
-                            )
-                    else:
-                        st.error(f"Error: {result['detail']}")
                 except Exception as e:
                     st.write(f"Error: {e}")
         else:
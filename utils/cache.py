@@ -0,0 +1,327 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from utils.metrics import CACHE_REQUESTS
+
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+def pickled_size(value: Any) -> int:
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class Cache(ABC):
+    """Key-value cache with TTL expiry, LRU eviction and hit/miss counters.
+
+    Entries are evicted least recently used first once there are more than
+    `max_entries` of them or, with `max_bytes`, once their pickled values
+    add up to more than that.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        name: str = "default",
+        max_bytes: Optional[int] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def _hit(self, count: int = 1):
+        self.hits += count
+        CACHE_REQUESTS.labels(self.name, "hit").inc(count)
+
+    def _miss(self, count: int = 1):
+        self.misses += count
+        CACHE_REQUESTS.labels(self.name, "miss").inc(count)
+
+    def _over_budget(self, entries: int, size: int) -> bool:
+        return entries > self.max_entries or (
+            self.max_bytes is not None and size > self.max_bytes
+        )
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None): ...
+
+    @abstractmethod
+    def delete(self, key: str): ...
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the cached values among `keys`; missing keys are left out."""
+        missing = object()
+        found = {}
+        for key in keys:
+            value = self.get(key, missing)
+            if value is not missing:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def size_bytes(self) -> int:
+        """Total pickled size of the cached values."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "entries": len(self),
+            "bytes": self.size_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache; values are sized by their pickled length."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # key -> (expires_at, value, size)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.time()):
+                self._pop(key)
+                self._miss()
+                return default
+            self._data.move_to_end(key)
+            self._hit()
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        size = pickled_size(value)
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (self._expires_at(ttl), value, size)
+            self._bytes += size
+            while self._data and self._over_budget(len(self._data), self._bytes):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def __len__(self):
+        return len(self._data)
+
+    def size_bytes(self):
+        return self._bytes
+
+
+class SQLiteCache(Cache):
+    """On-disk cache that survives restarts; values are pickled.
+
+    Expiry and eviction run once per tenth of `max_entries` rows (or tenth of
+    `max_bytes`) written by this process rather than on every write, so the
+    table may briefly run that far over its limits.
+    """
+
+    # Stay under SQLite's limit on bound parameters per statement
+    MAX_PARAMS = 500
+    EVICT_FRACTION = 10
+
+    def __init__(self, path: Path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pid = None
+        self._connection = None
+        self._written_rows = 0
+        self._written_bytes = 0
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each worker process opens its own
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                str(self.path), timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._miss()
+                return default
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._hit()
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        now = time.time()
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self.MAX_PARAMS):
+                batch = keys[i : i + self.MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+                    "AND (expires_at IS NULL OR expires_at >= ?)",
+                    (*batch, now),
+                ).fetchall()
+                self._conn.execute(
+                    f"UPDATE cache SET accessed_at = ? WHERE key IN ({placeholders})",
+                    (now, *batch),
+                )
+                found.update(rows)
+            self._conn.commit()
+            self._hit(len(found))
+            self._miss(len(keys) - len(found))
+        return {key: pickle.loads(blob) for key, blob in found.items()}
+
+    def set_many(self, items, ttl=None):
+        if not items:
+            return
+        expires_at = self._expires_at(ttl)
+        now = time.time()
+        rows = [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at, now)
+            for key, value in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows
+            )
+            self._written_rows += len(rows)
+            self._written_bytes += sum(len(row[1]) for row in rows)
+            if self._eviction_due():
+                self._evict()
+            self._conn.commit()
+
+    def _eviction_due(self) -> bool:
+        if self._written_rows >= max(1, self.max_entries // self.EVICT_FRACTION):
+            return True
+        return (
+            self.max_bytes is not None
+            and self._written_bytes >= self.max_bytes // self.EVICT_FRACTION
+        )
+
+    def _evict(self):
+        self._written_rows = self._written_bytes = 0
+        self._conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+            (time.time(),),
+        )
+        entries, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM cache"
+        ).fetchone()
+        if not self._over_budget(entries, size):
+            return
+        # Keep the most recently used entries that fit both limits
+        self._conn.execute(
+            """DELETE FROM cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key,
+                        ROW_NUMBER() OVER recent AS position,
+                        SUM(length(value)) OVER recent AS running_bytes
+                    FROM cache
+                    WINDOW recent AS (
+                        ORDER BY accessed_at DESC ROWS UNBOUNDED PRECEDING
+                    )
+                ) WHERE position > ? OR running_bytes > ?
+            )""",
+            (self.max_entries, size if self.max_bytes is None else self.max_bytes),
+        )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(length(value)), 0) FROM cache"
+            ).fetchone()[0]
+
+
+def get_cache(namespace: str) -> Cache:
+    """Build the cache configured by CACHE_BACKEND (memory or sqlite)."""
+    backend = os.getenv("CACHE_BACKEND", "memory")
+    ttl = float(os.getenv("CACHE_TTL", DEFAULT_TTL))
+    max_entries = int(os.getenv("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    max_bytes = int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+    if backend == "memory":
+        return MemoryCache(
+            ttl=ttl, max_entries=max_entries, name=namespace, max_bytes=max_bytes
+        )
+    if backend == "sqlite":
+        cache_dir = Path(os.getenv("CACHE_DIR", ".cache"))
+        return SQLiteCache(
+            cache_dir / f"{namespace}.sqlite",
+            ttl=ttl,
+            max_entries=max_entries,
+            name=namespace,
+            max_bytes=max_bytes,
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
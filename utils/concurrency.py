@@ -0,0 +1,145 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """Thread pool for blocking work with a concurrency limit and bounded backlog.
+
+    At most `max_workers` calls run at once and up to `max_pending` more may
+    wait; beyond that `run` raises ExecutorBusy so callers can shed load
+    instead of queueing without limit. A slot is held until its call returns
+    on the worker thread, even if the awaiting coroutine was cancelled first.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+
+    @classmethod
+    def from_env(
+        cls, name: str, default_workers: int, default_pending: int
+    ) -> "BoundedExecutor":
+        prefix = name.upper()
+        return cls(
+            name,
+            max_workers=int(os.getenv(f"{prefix}_MAX_WORKERS", default_workers)),
+            max_pending=int(os.getenv(f"{prefix}_MAX_PENDING", default_pending)),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_pending:
+                raise ExecutorBusy(f"{self.name} executor is at capacity")
+            self._pending += 1
+        # Copy the context so tracing spans carry over to the worker thread
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Runs once the thread is done (or the call is cancelled before it
+        # starts), not when an awaiting coroutine gives up on it
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self._submit(fn, *args, **kwargs))
+
+    async def iterate(
+        self, fn: Callable[..., Iterator], *args, **kwargs
+    ) -> AsyncIterator:
+        """Drain a blocking iterator on one worker thread, yielding items as they come.
+
+        If the consumer stops early (a client disconnects mid-stream), the
+        worker closes the iterator at its next item instead of draining it.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        stopped = threading.Event()
+
+        def put(entry):
+            if not stopped.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, entry)
+
+        def pump():
+            iterator = None
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                for item in iterator:
+                    if stopped.is_set():
+                        break
+                    put((item, None))
+            except BaseException as e:
+                put((done, e))
+                return
+            finally:
+                # Closing a generator releases what it holds, e.g. an HTTP stream
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            put((done, None))
+
+        self._submit(pump)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is done:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait: Optional[bool] = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per second on average."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -1,8 +1,10 @@
-from IPython.display import display, Markdown
 from datetime import datetime
 
 
 def md(t):
+    # Notebook-only helper; IPython is too heavy to import on the API's startup path
+    from IPython.display import display, Markdown
+
     display(Markdown(t))
 
 
@@ -18,18 +20,19 @@ def seconds_to_hms(seconds):
     remaining_seconds = seconds % 60
 
     if hours > 0:
-        return f"{hours:02}:{minutes:02}:{remaining_seconds}"  # Show hour if greater than 0
+        # Show hour if greater than 0
+        return f"{hours:02}:{minutes:02}:{remaining_seconds:02}"
     else:
         return f"{minutes:02}:{remaining_seconds:02}"
 
 
 def time_to_seconds(time_str):
-    # Check the format of the input string
-    if ":" in time_str and len(time_str.split(":")) == 2:  # Format is "M:S"
-        t = datetime.strptime(time_str, "%M:%S")
-        return t.minute * 60 + t.second
-    elif ":" in time_str and len(time_str.split(":")) == 3:  # Format is "H:M:S"
-        t = datetime.strptime(time_str, "%H:%M:%S")
-        return t.hour * 3600 + t.minute * 60 + t.second
-    else:
+    # Accepts "M:S" or "H:M:S"; minutes may exceed 59 in "M:S" (e.g. "75:00")
+    parts = time_str.strip().split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
         raise ValueError(f"Invalid time format: {time_str}")
+
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
@@ -0,0 +1,111 @@
+import os
+import time
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+try:
+    from opentelemetry import trace
+
+    tracer = trace.get_tracer("youtube_summarizer")
+except ImportError:
+    # Spans are optional; metrics work without OpenTelemetry installed
+    tracer = None
+
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time spent in each pipeline stage",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+STAGE_ERRORS = Counter(
+    "pipeline_stage_errors_total", "Pipeline stages that raised", ["stage"]
+)
+TRANSCRIPT_SEGMENTS = Histogram(
+    "transcript_segments",
+    "Caption segments per fetched transcript",
+    buckets=(50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+)
+TRANSCRIPT_CHARS = Histogram(
+    "transcript_characters",
+    "Characters per fetched transcript",
+    buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6),
+)
+INDEX_CHUNKS = Histogram(
+    "index_chunks",
+    "Chunks embedded per new index",
+    buckets=(10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Prompt tokens per LLM call", ["model"], buckets=TOKEN_BUCKETS
+)
+OUTPUT_TOKENS = Histogram(
+    "llm_output_tokens", "Output tokens per LLM call", ["model"], buckets=TOKEN_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+PROXY_ATTEMPTS = Counter(
+    "proxy_attempts_total", "Transcript fetch attempts through proxies", ["result"]
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total", "Retried calls to external APIs", ["upstream"]
+)
+YOUTUBE_QUOTA_UNITS = Counter(
+    "youtube_quota_units_total",
+    "YouTube Data API quota units spent, including retried attempts",
+    ["method"],
+)
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Time a pipeline stage, and trace it when OpenTelemetry is installed."""
+    span = (
+        tracer.start_as_current_span(name, attributes=attributes)
+        if tracer
+        else nullcontext()
+    )
+    start = time.perf_counter()
+    with span:
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of `stage`."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> bytes:
+    """Prometheus text output, aggregated across gunicorn workers if configured."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()